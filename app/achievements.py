@@ -0,0 +1,316 @@
+"""Реестр достижений и их проверка за один проход.
+
+Каждое достижение — правило над SessionFacts: показатели текущей игры плюс
+накопленные итоги ребёнка (из rollup child_mode_stats, без COUNT(*) по
+сырым таблицам). На финише игры: один запрос за открытыми достижениями
+ребёнка, один — за итогами, один INSERT новых. Метаданные достижений
+(id, название, иконка) кэшируются в процессе.
+
+Новое достижение = строка в CATALOG + правило в RULES. Чтобы выдать его
+детям задним числом, по всей истории игр:
+
+    python -m app.achievements backfill [--chunk 10000]
+"""
+import argparse
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models, queries, schemas
+from .stats import _insert_for
+
+# code, title, description, icon
+CATALOG = [
+    ("streak_5", "Серия 5", "5 правильных подряд", "🔥"),
+    ("perfect_game", "Идеально", "100% точность за игру", "🎯"),
+    ("fast_2000", "Молния", "Средняя реакция быстрее 2000 мс", "⚡"),
+    ("games_10", "Опытный", "Сыграно 10 игр", "🏆"),
+    ("words_100", "Читатель", "Прочитано 100 слов", "📘"),
+]
+
+
+@dataclass(frozen=True)
+class SessionFacts:
+    attempts: int
+    correct: int
+    reaction_ms_sum: int
+    max_streak: int
+    lifetime_sessions: int   # завершённых игр, включая эту
+    lifetime_attempts: int   # ответов в завершённых играх, включая эту
+
+    @property
+    def accuracy(self) -> float:
+        return (self.correct / self.attempts) if self.attempts else 0.0
+
+    @property
+    def avg_reaction_ms(self) -> float:
+        return (self.reaction_ms_sum / self.attempts) if self.attempts else 0.0
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str
+    check: Callable[[SessionFacts], bool]
+
+
+RULES: list[Rule] = [
+    Rule("streak_5", lambda f: f.max_streak >= 5),
+    Rule("perfect_game", lambda f: f.accuracy >= 1.0),
+    Rule("fast_2000", lambda f: f.attempts > 0 and f.avg_reaction_ms < 2000),
+    Rule("games_10", lambda f: f.lifetime_sessions >= 10),
+    Rule("words_100", lambda f: f.lifetime_attempts >= 100),
+]
+
+
+def max_streak(correct_flags) -> int:
+    best = cur = 0
+    for ok in correct_flags:
+        if ok:
+            cur += 1
+            best = max(best, cur)
+        else:
+            cur = 0
+    return best
+
+
+# ---- метаданные: кэш в процессе ----
+
+_catalog: dict[str, schemas.AchievementOut] | None = None
+_catalog_ids: dict[str, int] = {}
+_catalog_rows: tuple[tuple[int, schemas.AchievementOut], ...] = ()
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog(db: Session) -> dict[str, schemas.AchievementOut]:
+    global _catalog, _catalog_ids, _catalog_rows
+    with _catalog_lock:
+        if _catalog is None:
+            rows = db.execute(select(models.Achievement).order_by(models.Achievement.id.asc())).scalars().all()
+            out = [
+                (a.id, schemas.AchievementOut(code=a.code, title=a.title, description=a.description, icon=a.icon))
+                for a in rows
+            ]
+            _catalog_ids = {a.code: a.id for a in rows}
+            _catalog_rows = tuple(out)
+            _catalog = {item.code: item for _, item in out}
+        return _catalog
+
+
+def catalog(db: Session) -> tuple[tuple[int, schemas.AchievementOut], ...]:
+    """(id, достижение) в порядке id. Пока каталог не сброшен — один и тот же объект."""
+    _load_catalog(db)
+    return _catalog_rows
+
+
+def invalidate_catalog() -> None:
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def seed(db: Session) -> int:
+    """Добавить недостающие коды из CATALOG. Возвращает, сколько добавлено."""
+    existing = set(db.execute(select(models.Achievement.code)).scalars())
+    missing = [row for row in CATALOG if row[0] not in existing]
+    for code, title, desc, icon in missing:
+        db.add(models.Achievement(code=code, title=title, description=desc, icon=icon))
+    if missing:
+        db.commit()
+    invalidate_catalog()
+    return len(missing)
+
+
+# ---- проверка ----
+
+def lifetime_totals(db: Session, child_id: int) -> tuple[int, int]:
+    sessions_n, attempts_n = db.execute(queries.lifetime_totals(child_id)).one()
+    return int(sessions_n), int(attempts_n)
+
+
+def unlocked_ids(db: Session, child_id: int) -> set[int]:
+    return set(db.scalars(queries.unlocked_achievements(child_id)))
+
+
+def newly_earned(facts: SessionFacts, unlocked: set[int], ids: dict[str, int]) -> list[str]:
+    return [
+        r.code
+        for r in RULES
+        if r.code in ids and ids[r.code] not in unlocked and r.check(facts)
+    ]
+
+
+def insert_unlocks(db: Session, rows: list[tuple[int, int]]) -> None:
+    """Одним INSERT; уже открытые (гонка двух финишей) тихо пропускаются."""
+    if not rows:
+        return
+    insert = _insert_for(db)
+    stmt = insert(models.ChildAchievement).values(
+        [{"child_id": child_id, "achievement_id": ach_id} for child_id, ach_id in rows]
+    )
+    db.execute(stmt.on_conflict_do_nothing())
+
+
+def evaluate(db: Session, child_id: int, facts: SessionFacts) -> list[schemas.AchievementOut]:
+    """Открыть заработанные достижения. Коммит — на вызывающем."""
+    catalog = _load_catalog(db)
+    ids = _catalog_ids
+    codes = newly_earned(facts, unlocked_ids(db, child_id), ids)
+    insert_unlocks(db, [(child_id, ids[c]) for c in codes])
+    return [catalog[c] for c in codes]
+
+
+# ---- бэкфилл по всей истории ----
+
+class _UnlockedByChild:
+    """Слияние с потоком child_achievements, упорядоченным по child_id."""
+
+    def __init__(self, conn: Connection, chunk: int):
+        CA = models.ChildAchievement
+        rows = conn.execution_options(yield_per=chunk).execute(
+            select(CA.child_id, CA.achievement_id).order_by(CA.child_id)
+        )
+        self._rows: Iterator = iter(rows)
+        self._head = next(self._rows, None)
+
+    def get(self, child_id: int) -> set[int]:
+        out: set[int] = set()
+        while self._head is not None and self._head[0] <= child_id:
+            if self._head[0] == child_id:
+                out.add(self._head[1])
+            self._head = next(self._rows, None)
+        return out
+
+
+def backfill(engine: Engine, chunk: int = 10_000, progress: Callable[[dict], None] | None = None) -> dict:
+    """Проверить все правила по всей истории и выдать недостающие достижения.
+
+    Завершённые игры и их ответы читаются одним потоком (yield_per) в порядке
+    (child_id, session_id, attempt_id); в памяти — только счётчики текущей игры
+    и ребёнка. Новые строки пишутся пачками по chunk через отдельное соединение.
+    """
+    S = models.Session
+    A = models.Attempt
+    stmt = (
+        select(S.child_id, S.id, A.correct, A.reaction_ms)
+        .select_from(S)
+        .outerjoin(A, A.session_id == S.id)
+        .where(S.finished_at.isnot(None))
+        .order_by(S.child_id, S.id, A.id)
+    )
+
+    report = {"sessions": 0, "attempts": 0, "children": 0, "unlocked": 0, "elapsed_s": 0.0}
+    t0 = time.perf_counter()
+
+    with Session(bind=engine) as wdb, engine.connect() as rconn, engine.connect() as uconn:
+        seed(wdb)
+        _load_catalog(wdb)
+        ids = dict(_catalog_ids)
+        all_ids = set(ids.values())
+        existing = _UnlockedByChild(uconn, chunk)
+
+        pending: list[tuple[int, int]] = []
+        child = None
+        unlocked: set[int] = set()
+        life_sessions = life_attempts = 0
+
+        session_id = None
+        n = correct_n = reaction = best = cur = 0
+
+        def close_session():
+            nonlocal life_sessions, life_attempts
+            life_sessions += 1
+            life_attempts += n
+            report["sessions"] += 1
+            if unlocked >= all_ids:
+                return
+            facts = SessionFacts(
+                attempts=n,
+                correct=correct_n,
+                reaction_ms_sum=reaction,
+                max_streak=best,
+                lifetime_sessions=life_sessions,
+                lifetime_attempts=life_attempts,
+            )
+            for code in newly_earned(facts, unlocked, ids):
+                unlocked.add(ids[code])
+                pending.append((child, ids[code]))
+
+        def flush():
+            if pending:
+                insert_unlocks(wdb, pending)
+                wdb.commit()
+                report["unlocked"] += len(pending)
+                pending.clear()
+
+        rows = rconn.execution_options(yield_per=chunk).execute(stmt)
+        for child_id, sid, correct, reaction_ms in rows:
+            if sid != session_id:
+                if session_id is not None:
+                    close_session()
+                if child_id != child:
+                    child = child_id
+                    unlocked = existing.get(child_id)
+                    life_sessions = life_attempts = 0
+                    report["children"] += 1
+                session_id = sid
+                n = correct_n = reaction = best = cur = 0
+
+            if correct is not None:  # у игры без ответов — одна строка с NULL
+                n += 1
+                reaction += reaction_ms
+                if correct:
+                    correct_n += 1
+                    cur += 1
+                    best = max(best, cur)
+                else:
+                    cur = 0
+                report["attempts"] += 1
+                if report["attempts"] % chunk == 0:
+                    if len(pending) >= chunk:
+                        flush()
+                    if progress:
+                        report["elapsed_s"] = time.perf_counter() - t0
+                        progress(dict(report))
+
+        if session_id is not None:
+            close_session()
+        flush()
+
+    report["elapsed_s"] = time.perf_counter() - t0
+    return report
+
+
+def _print_progress(r: dict) -> None:
+    rate = r["attempts"] / r["elapsed_s"] if r["elapsed_s"] else 0.0
+    print(f"  {r['attempts']:>12,} attempts  {r['sessions']:>10,} games  {rate:>12,.0f} attempts/s", flush=True)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.achievements")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("backfill", help="выдать достижения задним числом по всей истории")
+    b.add_argument("--chunk", type=int, default=10_000, help="строк на пачку чтения/записи")
+    b.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv[1:])
+
+    from .db import engine
+    from .migrations import upgrade
+
+    upgrade(engine)
+    r = backfill(engine, chunk=args.chunk, progress=None if args.quiet else _print_progress)
+    rate = r["attempts"] / r["elapsed_s"] if r["elapsed_s"] else 0.0
+    print(
+        f"backfill done: {r['children']:,} children, {r['sessions']:,} games, {r['attempts']:,} attempts, "
+        f"{r['unlocked']:,} new unlocks in {r['elapsed_s']:.1f}s ({rate:,.0f} attempts/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
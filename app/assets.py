@@ -0,0 +1,357 @@
+"""Сборка статики и раздача собранного.
+
+Офлайн-шаг (на деплое, не в рантайме):
+
+    python -m app.assets build            # static/ → static/dist/ + manifest.json
+    python -m app.assets build --clean    # заодно удалить файлы прошлых сборок
+
+Что делает сборка:
+  * каждому файлу — имя с хэшем содержимого (img/bg-main.3f2a…png), ссылки
+    /static/... в index.html, CSS и JS переписываются на них;
+  * фоны из img/ — WebP и AVIF (нужен Pillow; без него остаются только
+    исходные PNG);
+  * текстовые файлы — рядом .gz и .br (brotli — если установлен).
+
+Раздача: AssetFiles подменяет обычный StaticFiles. Хэшированные файлы отдаются
+с `Cache-Control: immutable` на год: картинка — в лучшем формате из Accept
+(AVIF → WebP → PNG), текст — в лучшем сжатии из
+Accept-Encoding. Без manifest.json всё работает как раньше.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from typing import Optional
+
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+STATIC_DIR = "static"
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# фоны: ширина варианта (больше исходной не растягиваем) и качество.
+# Одна ширина: фон — background-size: cover на весь экран, нужно
+# max(100vw, 150vh) × DPR пикселей, и на телефоне, планшете и ноутбуке это
+# уже не меньше 1536 — узкие варианты никто бы не запросил.
+IMAGE_DIRS = ("img/",)
+IMAGE_MAX_WIDTH = 1536
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+COMPRESSIBLE = {".html", ".js", ".css", ".svg", ".json", ".txt", ".ico", ".cur"}
+REWRITE = {".html", ".css", ".js"}
+COMPRESS_MIN_BYTES = 512
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# (формат, mime) в порядке предпочтения
+IMAGE_FORMATS = (("avif", "image/avif"), ("webp", "image/webp"))
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(rel: str, data: bytes, suffix: str = "") -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}{suffix}.{_hash(data)}{ext}"
+
+
+def _write(out_dir: str, rel: str, data: bytes) -> None:
+    path = os.path.join(out_dir, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        return  # имя с хэшем: тот же файл уже лежит
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(out_dir: str, rel: str, data: bytes) -> dict:
+    if os.path.splitext(rel)[1] not in COMPRESSIBLE or len(data) < COMPRESS_MIN_BYTES:
+        return {}
+    encodings = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        _write(out_dir, rel + ".gz", gz)
+        encodings["gzip"] = rel + ".gz"
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            _write(out_dir, rel + ".br", br)
+            encodings["br"] = rel + ".br"
+    return encodings
+
+
+def _image_variants(out_dir: str, rel: str, data: bytes, warnings: list) -> list:
+    try:
+        from PIL import Image, features
+    except ImportError:
+        warnings.append("Pillow is not installed: image variants skipped (pip install pillow)")
+        return []
+    import io
+
+    formats = [(f, mime) for f, mime in IMAGE_FORMATS if features.check(f)]
+    for f, _ in IMAGE_FORMATS:
+        if not features.check(f):
+            warnings.append(f"Pillow has no {f.upper()} support: {f} variants skipped")
+
+    src = Image.open(io.BytesIO(data))
+    src.load()
+    if src.mode not in ("RGB", "RGBA"):
+        src = src.convert("RGBA" if "transparency" in src.info else "RGB")
+
+    width = min(IMAGE_MAX_WIDTH, src.width)
+    img = src if width == src.width else src.resize(
+        (width, round(src.height * width / src.width)), Image.LANCZOS,
+    )
+    variants = []
+    for fmt, mime in formats:
+        buf = io.BytesIO()
+        quality = AVIF_QUALITY if fmt == "avif" else WEBP_QUALITY
+        img.save(buf, fmt.upper(), quality=quality)
+        out = buf.getvalue()
+        name = _hashed_name(os.path.splitext(rel)[0] + "." + fmt, out, f".{width}w")
+        _write(out_dir, name, out)
+        variants.append({"type": mime, "width": width, "path": name, "bytes": len(out)})
+    return variants
+
+
+def _rewrite(text: str, urls: dict[str, str]) -> str:
+    if not urls:
+        return text
+    # длинные пути раньше коротких; за путём не должно продолжаться имя файла
+    alt = "|".join(re.escape(k) for k in sorted(urls, key=len, reverse=True))
+    return re.sub(rf"/static/({alt})(?![\w./-])", lambda m: "/static/" + urls[m.group(1)], text)
+
+
+def build(src: str = STATIC_DIR, clean: bool = False) -> tuple[dict, list]:
+    """Собрать static/ в static/dist/. Возвращает (manifest, предупреждения)."""
+    out_dir = os.path.join(src, DIST_DIRNAME)
+    files = []
+    for root, dirs, names in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != out_dir)
+        for name in sorted(names):
+            rel = os.path.relpath(os.path.join(root, name), src).replace(os.sep, "/")
+            files.append(rel)
+
+    # сначала то, на что ссылаются (картинки, звук), потом CSS, JS и HTML:
+    # хэш файла со ссылками считается уже после их замены
+    order = {".css": 1, ".js": 2, ".html": 3}
+    files.sort(key=lambda r: (order.get(os.path.splitext(r)[1], 0), r))
+
+    warnings: list = []
+    assets: dict = {}
+    urls: dict[str, str] = {}
+    index = None
+    for rel in files:
+        with open(os.path.join(src, *rel.split("/")), "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(rel)[1]
+        if ext in REWRITE:
+            data = _rewrite(data.decode("utf-8"), urls).encode("utf-8")
+
+        if rel == "index.html":
+            # точка входа: имя без хэша, всегда перепроверяется
+            _write_fresh(out_dir, rel, data)
+            index = {"path": rel, "type": "text/html", "encodings": _compress_fresh(out_dir, rel, data)}
+            continue
+
+        name = _hashed_name(rel, data)
+        _write(out_dir, name, data)
+        entry = {
+            "path": name,
+            "type": mimetypes.guess_type(rel)[0] or "application/octet-stream",
+            "bytes": len(data),
+            "encodings": _compress(out_dir, name, data),
+        }
+        if rel.startswith(IMAGE_DIRS) and ext in (".png", ".jpg", ".jpeg"):
+            entry["variants"] = _image_variants(out_dir, rel, data, warnings)
+        assets[rel] = entry
+        urls[rel] = name
+
+    manifest = {"version": 1, "assets": assets, "index": index}
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+
+    if clean:
+        _clean(out_dir, manifest)
+    return manifest, sorted(set(warnings))
+
+
+def _write_fresh(out_dir: str, rel: str, data: bytes) -> None:
+    # для файлов без хэша в имени: перезаписать
+    path = os.path.join(out_dir, *rel.split("/"))
+    if os.path.exists(path):
+        os.remove(path)
+    _write(out_dir, rel, data)
+
+
+def _compress_fresh(out_dir: str, rel: str, data: bytes) -> dict:
+    for _, suffix in ENCODINGS:
+        path = os.path.join(out_dir, *(rel + suffix).split("/"))
+        if os.path.exists(path):
+            os.remove(path)
+    return _compress(out_dir, rel, data)
+
+
+def _manifest_files(manifest: dict) -> set[str]:
+    keep = {MANIFEST_NAME}
+    entries = list(manifest["assets"].values()) + ([manifest["index"]] if manifest["index"] else [])
+    for e in entries:
+        keep.add(e["path"])
+        keep.update(e.get("encodings", {}).values())
+        keep.update(v["path"] for v in e.get("variants", ()))
+    return keep
+
+
+def _clean(out_dir: str, manifest: dict) -> None:
+    keep = _manifest_files(manifest)
+    for root, _dirs, names in os.walk(out_dir):
+        for name in names:
+            rel = os.path.relpath(os.path.join(root, name), out_dir).replace(os.sep, "/")
+            if rel not in keep:
+                os.remove(os.path.join(root, name))
+
+
+# ---- раздача ----
+
+def _q(header: str) -> dict[str, float]:
+    """'br;q=1, gzip;q=0.5' → {'br': 1.0, 'gzip': 0.5}"""
+    out = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        out[token.strip().lower()] = q
+    return out
+
+
+def pick_encoding(entry: dict, accept_encoding: str) -> Optional[str]:
+    accepted = _q(accept_encoding)
+    for enc, _ in ENCODINGS:
+        if enc in entry.get("encodings", {}) and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+            return enc
+    return None
+
+
+def pick_variant(entry: dict, accept: str) -> Optional[dict]:
+    variants = entry.get("variants")
+    if not variants:
+        return None
+    accepted = _q(accept)
+    for _, mime in IMAGE_FORMATS:
+        # image/* и */* форматы не подтверждают: браузер без AVIF тоже их шлёт
+        if accepted.get(mime, 0.0) <= 0:
+            continue
+        variant = next((v for v in variants if v["type"] == mime), None)
+        if variant is not None:
+            return variant
+    return None
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles + собранные файлы из static/dist по manifest.json."""
+
+    def __init__(self, directory: str = STATIC_DIR):
+        super().__init__(directory=directory)
+        self.dist = os.path.join(directory, DIST_DIRNAME)
+        self.manifest: Optional[dict] = None
+        self._by_path: dict[str, dict] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        path = os.path.join(self.dist, MANIFEST_NAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = None
+        self.manifest = manifest
+        self._by_path = {e["path"]: e for e in manifest["assets"].values()} if manifest else {}
+
+    def url(self, rel: str, prefix: str = "/static/") -> str:
+        """URL файла из static/: хэшированный после сборки, иначе исходный."""
+        entry = self.manifest["assets"].get(rel) if self.manifest else None
+        return prefix + (entry["path"] if entry else rel)
+
+    def _response(self, entry: dict, headers: Headers, cache_control: str) -> FileResponse:
+        vary = []
+        path, media_type, encoding = entry["path"], entry["type"], None
+
+        if entry.get("variants"):
+            vary.append("Accept")
+            variant = pick_variant(entry, headers.get("accept", ""))
+            if variant is not None:
+                path, media_type = variant["path"], variant["type"]
+        if entry.get("encodings"):
+            vary.append("Accept-Encoding")
+            encoding = pick_encoding(entry, headers.get("accept-encoding", ""))
+            if encoding is not None:
+                path = entry["encodings"][encoding]
+
+        out_headers = {"Cache-Control": cache_control}
+        if vary:
+            out_headers["Vary"] = ", ".join(vary)
+        if encoding is not None:
+            out_headers["Content-Encoding"] = encoding
+        return FileResponse(os.path.join(self.dist, *path.split("/")), media_type=media_type, headers=out_headers)
+
+    async def get_response(self, path: str, scope):
+        entry = self._by_path.get(path.replace(os.sep, "/"))
+        if entry is None:
+            return await super().get_response(path, scope)
+        return self._response(entry, Headers(scope=scope), IMMUTABLE)
+
+    def index_response(self, scope) -> FileResponse:
+        """index.html: собранный (со ссылками на хэшированные файлы) или исходный."""
+        if self.manifest and self.manifest.get("index"):
+            return self._response(self.manifest["index"], Headers(scope=scope), "no-cache")
+        return FileResponse(os.path.join(self.directory, "index.html"))
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.assets")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="собрать static/ в static/dist/")
+    b.add_argument("--src", default=STATIC_DIR)
+    b.add_argument("--clean", action="store_true", help="удалить файлы, которых нет в новом manifest")
+    args = ap.parse_args(argv[1:])
+
+    manifest, warnings = build(args.src, clean=args.clean)
+    for w in warnings:
+        print(f"warning: {w}", file=sys.stderr)
+
+    src_total = sum(e["bytes"] for e in manifest["assets"].values())
+    print(f"{len(manifest['assets'])} assets, {src_total / 1e6:.1f} MB → {os.path.join(args.src, DIST_DIRNAME)}")
+    for rel, e in sorted(manifest["assets"].items()):
+        best = [f"{v['type'].split('/')[1]}@{v['width']}w {v['bytes'] / 1e3:.0f} kB" for v in e.get("variants", ())]
+        if best:
+            print(f"  {rel}: {e['bytes'] / 1e3:.0f} kB → " + ", ".join(best))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,148 @@
+"""Отложенная запись ответов с групповым коммитом (write-behind).
+
+Под нагрузкой БД тратит время на fsync крошечных транзакций «один ответ —
+один коммит». В режиме буфера ответы копятся в памяти, а фоновый поток
+пишет их одной транзакцией раз в ATTEMPT_BUFFER_MS мс или по
+ATTEMPT_BUFFER_ROWS строк — что наступит раньше.
+
+    ATTEMPT_BUFFER=off        — пишем сразу, как раньше (по умолчанию)
+    ATTEMPT_BUFFER=flush      — ответ клиенту после коммита пачки с его строками
+    ATTEMPT_BUFFER=immediate  — ответ сразу; при падении процесса теряется
+                                не больше одного интервала ответов
+                                (WS-канал всё равно ждёт коммита пачки)
+
+Survival пишет мимо буфера: жизни считаются в той же транзакции. Финиш
+сначала вызывает flush(), на остановке сервера буфер дописывается.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+ATTEMPT_BUFFER = os.getenv("ATTEMPT_BUFFER", "off")
+ATTEMPT_BUFFER_MS = int(os.getenv("ATTEMPT_BUFFER_MS", "25"))
+ATTEMPT_BUFFER_ROWS = int(os.getenv("ATTEMPT_BUFFER_ROWS", "500"))
+
+MODES = ("off", "flush", "immediate")
+
+log = logging.getLogger("reading_game.attempt_buffer")
+
+
+class AttemptBuffer:
+    def __init__(
+        self,
+        write: Callable[[list[dict]], None],
+        mode: str = ATTEMPT_BUFFER,
+        interval_ms: int = ATTEMPT_BUFFER_MS,
+        max_rows: int = ATTEMPT_BUFFER_ROWS,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"ATTEMPT_BUFFER must be one of {MODES}, got {mode!r}")
+        self._write = write
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.max_rows = max_rows
+        self._rows: list[dict] = []
+        self._futures: list[Future] = []
+        self._cond = threading.Condition()
+        # один писатель за раз: пачки ложатся в порядке поступления, а
+        # flush() из финиша дожидается пачки, которую уже пишет фон
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def add(self, rows: list[dict], wait: bool = False) -> Optional[Future]:
+        """Поставить строки в очередь. В режиме flush (или с wait=True) —
+        Future, который завершится после коммита пачки с этими строками."""
+        fut = Future() if wait or self.mode == "flush" else None
+        with self._cond:
+            was_empty = not self._rows
+            self._rows.extend(rows)
+            if fut is not None:
+                self._futures.append(fut)
+            if was_empty or len(self._rows) >= self.max_rows:
+                self._cond.notify()
+        return fut
+
+    def flush(self) -> int:
+        """Синхронно записать всё, что накопилось. Возвращает число строк."""
+        with self._flush_lock:
+            with self._cond:
+                rows, futures = self._rows, self._futures
+                self._rows, self._futures = [], []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception as e:
+                if futures:
+                    log.exception("attempt buffer flush failed (%d rows)", len(rows))
+                    for f in futures:
+                        f.set_exception(e)
+                else:
+                    # клиентам уже ответили — строки потеряны
+                    log.exception("attempt buffer flush failed, %d rows dropped", len(rows))
+                    self.rows_dropped += len(rows)
+                return 0
+            for f in futures:
+                f.set_result(None)
+            self.batches += 1
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._rows)
+        return {
+            "mode": self.mode,
+            "interval_ms": int(self.interval * 1000),
+            "max_rows": self.max_rows,
+            "pending": pending,
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "avg_batch": (self.rows_written / self.batches) if self.batches else 0.0,
+        }
+
+    # ---- фоновый сброс ----
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="attempt-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join(timeout=10)
+            self._thread = None
+        # то, что пришло после остановки потока
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._rows and not self._stopping:
+                    self._cond.wait()
+                # первая строка пришла — даём пачке набраться
+                if not self._stopping and len(self._rows) < self.max_rows:
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:
+                log.exception("attempt buffer flush failed")
+            if stopping:
+                return
@@ -0,0 +1,147 @@
+"""Аудиоспрайты голосовых подсказок.
+
+Офлайн-шаг, как и app.assets (запускать до него — спрайты тоже получают
+хэшированные имена):
+
+    python -m app.audio build
+
+Каждая категория static/audio/<категория>/*.ogg склеивается в один файл
+static/audio/sprites/<категория>.ogg с паузой между фразами; рядом
+sprites.json — где в спрайте начинается каждая фраза и сколько длится.
+Клиент берёт манифест с GET /api/audio/sprites, заранее скачивает по одному
+файлу на категорию и играет фразы по смещению — без запроса на каждую фразу.
+
+Нужен ffmpeg (путь — в FFMPEG, иначе ищется в PATH). Фразы декодируются в PCM
+с общей частотой, склеиваются здесь же (поэтому смещения точны до сэмпла) и
+кодируются в Opus одним вызовом.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from typing import Optional
+
+AUDIO_DIR = "audio"
+SPRITES_DIRNAME = "sprites"
+MANIFEST_NAME = "sprites.json"
+
+SAMPLE_RATE = 48000
+SAMPLE_BYTES = 2            # s16le, моно
+GAP_MS = 250                # тишина между фразами: запас на неточный стоп по таймеру
+BITRATE = "48k"
+
+
+class AudioBuildError(RuntimeError):
+    pass
+
+
+def _ffmpeg() -> str:
+    exe = os.getenv("FFMPEG") or shutil.which("ffmpeg")
+    if not exe:
+        raise AudioBuildError("ffmpeg not found: install it or set FFMPEG=/path/to/ffmpeg")
+    return exe
+
+
+def _run(args: list[str], stdin: Optional[bytes] = None) -> bytes:
+    p = subprocess.run(args, input=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if p.returncode != 0:
+        tail = p.stderr.decode("utf-8", "replace").strip().splitlines()[-3:]
+        raise AudioBuildError(f"{os.path.basename(args[0])} failed: " + " | ".join(tail))
+    return p.stdout
+
+
+def _decode(exe: str, path: str) -> bytes:
+    return _run([
+        exe, "-v", "error", "-i", path,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-",
+    ])
+
+
+def _encode(exe: str, pcm: bytes, out_path: str) -> None:
+    tmp = out_path + ".tmp"
+    _run([
+        exe, "-v", "error", "-y",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "-",
+        "-c:a", "libopus", "-b:a", BITRATE, "-f", "ogg", tmp,
+    ], stdin=pcm)
+    os.replace(tmp, out_path)
+
+
+def _ms(n_bytes: int) -> int:
+    return round(n_bytes / SAMPLE_BYTES * 1000 / SAMPLE_RATE)
+
+
+def categories(src: str) -> dict[str, list[str]]:
+    """{категория: [файлы по имени]} из static/audio; каталог sprites пропускается."""
+    root = os.path.join(src, AUDIO_DIR)
+    out = {}
+    for cat in sorted(os.listdir(root)):
+        path = os.path.join(root, cat)
+        if cat == SPRITES_DIRNAME or not os.path.isdir(path):
+            continue
+        files = sorted(n for n in os.listdir(path) if n.endswith(".ogg"))
+        if files:
+            out[cat] = files
+    return out
+
+
+def build(src: str = "static") -> dict:
+    """Собрать спрайты и sprites.json. Возвращает манифест."""
+    exe = _ffmpeg()
+    out_dir = os.path.join(src, AUDIO_DIR, SPRITES_DIRNAME)
+    os.makedirs(out_dir, exist_ok=True)
+
+    gap = b"\0" * (SAMPLE_RATE * GAP_MS // 1000 * SAMPLE_BYTES)
+    manifest: dict = {"version": 1, "categories": {}}
+    for cat, files in categories(src).items():
+        pcm = bytearray()
+        clips = {}
+        for name in files:
+            data = _decode(exe, os.path.join(src, AUDIO_DIR, cat, name))
+            # [смещение, длительность] в мс
+            clips[name] = [_ms(len(pcm)), _ms(len(data))]
+            pcm += data + gap
+        rel = f"{AUDIO_DIR}/{SPRITES_DIRNAME}/{cat}.ogg"
+        _encode(exe, bytes(pcm), os.path.join(src, *rel.split("/")))
+        manifest["categories"][cat] = {"file": rel, "clips": clips}
+
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+    return manifest
+
+
+def load(src: str = "static") -> Optional[dict]:
+    """Манифест спрайтов или None, если сборки не было."""
+    try:
+        with open(os.path.join(src, AUDIO_DIR, SPRITES_DIRNAME, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.audio")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="склеить static/audio/<категория>/*.ogg в спрайты")
+    b.add_argument("--src", default="static")
+    args = ap.parse_args(argv[1:])
+
+    try:
+        manifest = build(args.src)
+    except AudioBuildError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    for cat, e in manifest["categories"].items():
+        size = os.path.getsize(os.path.join(args.src, *e["file"].split("/")))
+        total = sum(c[1] for c in e["clips"].values())
+        print(f"  {cat}: {len(e['clips'])} clips, {total / 1000:.1f}s → {e['file']} ({size / 1e3:.0f} kB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
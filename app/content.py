@@ -1,7 +1,10 @@
+import os
 import random
 from dataclasses import dataclass
 from typing import Optional
 
+from . import lexicon
+
 @dataclass(frozen=True)
 class WordFlashItem:
     item_id: str
@@ -492,17 +495,35 @@ VOCAB_CATEGORIES = {
     },
 }
 
-def list_all_categories():
-    base = list_themes()
-    vocab = [{"id": tid, "name": f"📘 {t['name']}"} for tid, t in sorted(VOCAB_CATEGORIES.items())]
-    return base + vocab
+# ---- Индекс контента ----
+# Неизменяемый снимок контента поверх хранилища (app/lexicon.py): кортежи слов
+# по (theme, difficulty) с уже применённым fallback по сложности, готовые маски
+# словарных слов и список "чужих" тем для odd_one_out. Тема индексируется при
+# первом обращении. Генераторы берут random.sample по индексам пула — O(n·k)
+# на сессию вместо копирования/перемешивания всего пула.
+#
+# Перезагрузка контента строит новый ContentIndex и подменяет ссылку целиком:
+# генерация, уже взявшая старый снимок, доработает на нём.
 
-def list_themes():
-    return [{"id": tid, "name": t["name"]} for tid, t in sorted(THEMES.items())]
+DIFFICULTIES = ("easy", "normal", "hard")
+
+# pack-файл словаря; если не задан — встроенные THEMES / VOCAB_CATEGORIES
+LEXICON_PATH = os.getenv("READING_GAME_LEXICON")
+# как часто проверять mtime pack-файла. Наблюдатель есть в каждом воркере, поэтому
+# новый pack подхватывают все; /api/admin/content/reload перезагружает только
+# процесс, принявший запрос. 0 — не следить (один воркер, перезагрузка вручную)
+LEXICON_WATCH_SECONDS = float(os.getenv("READING_GAME_LEXICON_WATCH", "5"))
+
+
+@dataclass(frozen=True)
+class VocabEntry:
+    word: str
+    masked: str               # слово с пропуском: вел_сипед
+    correct: str              # пропущенная буква
+    options: tuple[str, ...]  # варианты без повторов, правильный — первым
 
-def _pool_for(theme_id, difficulty):
-    theme = THEMES[theme_id]
 
+def _resolve_words(theme: dict, difficulty: str) -> tuple[str, ...]:
     words = (
         theme.get(difficulty)
         or theme.get("normal")
@@ -510,28 +531,165 @@ def _pool_for(theme_id, difficulty):
         or theme.get("hard")
         or []
     )
+    # без повторов: дистракторы и "лишнее" слово сравниваются по значению
+    return tuple(dict.fromkeys(words))
+
+
+def _vocab_entry(row: dict) -> VocabEntry:
+    word = row["word"]
+    miss_idx = row["missing_index"]
+    correct = word[miss_idx]
+    return VocabEntry(
+        word=word,
+        masked=word[:miss_idx] + "_" + word[miss_idx + 1:],
+        correct=correct,
+        options=tuple(dict.fromkeys([correct] + row["options"])),
+    )
+
+
+class ContentIndex:
+    def __init__(self, store):
+        self.store = store
+        self.version: str = store.version
+
+        header = store.header()
+        words = [e for e in header if e["kind"] == lexicon.KIND_WORDS]
+        vocab = [e for e in header if e["kind"] == lexicon.KIND_VOCAB]
+
+        self._themes = [{"id": e["id"], "name": e["name"]} for e in words]
+        self._categories = self._themes + [{"id": e["id"], "name": f"📘 {e['name']}"} for e in vocab]
+
+        theme_ids = [e["id"] for e in words]
+        self._other_themes = {
+            tid: tuple(t for t in theme_ids if t != tid) or (DEFAULT_THEME_ID,)
+            for tid in theme_ids
+        }
+        self._words: dict[tuple[int, str], tuple[str, ...]] = {}
+        self._vocab: dict[tuple[int, str], tuple[VocabEntry, ...]] = {}
+
+    def themes(self) -> list[dict]:
+        return list(self._themes)
+
+    def categories(self) -> list[dict]:
+        return list(self._categories)
+
+    def words(self, theme_id: int, difficulty: str) -> tuple[str, ...]:
+        if difficulty not in DIFFICULTIES:
+            difficulty = "normal"
+        words = self._words.get((theme_id, difficulty))
+        if words is None:
+            theme = self.store.theme(theme_id)
+            if theme is None:
+                raise KeyError(theme_id)
+            for diff in DIFFICULTIES:
+                self._words[(theme_id, diff)] = _resolve_words(theme, diff)
+            words = self._words[(theme_id, difficulty)]
+        return words
+
+    def vocab(self, theme_id: int, difficulty: str) -> tuple[VocabEntry, ...]:
+        if difficulty not in DIFFICULTIES:
+            difficulty = "normal"
+        rows = self._vocab.get((theme_id, difficulty))
+        if rows is None:
+            cat = self.store.vocab(theme_id) or {}
+            for diff in DIFFICULTIES:
+                self._vocab[(theme_id, diff)] = tuple(
+                    _vocab_entry(r) for r in (cat.get(diff) or cat.get("normal") or [])
+                )
+            rows = self._vocab[(theme_id, difficulty)]
+        return rows
+
+    def other_themes(self, theme_id: int) -> tuple[int, ...]:
+        return self._other_themes.get(theme_id, (DEFAULT_THEME_ID,))
+
+
+_index = ContentIndex(lexicon.DictStore(THEMES, VOCAB_CATEGORIES))
+
+
+def current() -> ContentIndex:
+    return _index
+
 
-    return list(words)
+def use_store(store) -> ContentIndex:
+    """Атомарно подменить контент: новый индекс, одна операция присваивания."""
+    global _index
+    _index = ContentIndex(store)
+    return _index
 
-def make_word_flash_items(n: int, difficulty: str, theme_id: int, options_k: int = 4) -> list[WordFlashItem]:
-    words = _pool_for(theme_id, difficulty)
-    pool = words[:]
-    random.shuffle(pool)
 
-    # без повторов в рамках сессии, если слов хватает
-    if len(pool) >= n:
-        pool = pool[:n]
+def reload(path: Optional[str] = None) -> ContentIndex:
+    path = path or LEXICON_PATH
+    if path:
+        return use_store(lexicon.open_store(path))
+    return use_store(lexicon.DictStore(THEMES, VOCAB_CATEGORIES))
+
+
+def lexicon_changed() -> bool:
+    """pack-файл на диске новее загруженного (для фонового наблюдателя)."""
+    if not LEXICON_PATH:
+        return False
+    try:
+        mtime = os.stat(LEXICON_PATH).st_mtime
+    except OSError:
+        return False
+    return mtime != getattr(current().store, "mtime", None)
+
+
+if LEXICON_PATH:
+    reload()
+
+
+def list_all_categories():
+    return current().categories()
+
+def list_themes():
+    return current().themes()
+
+def _pool_for(theme_id, difficulty):
+    return list(current().words(theme_id, difficulty))
+
+
+# ---- Генераторы ----
+# Вся случайность — через переданный random.Random: колоду сессии можно
+# воспроизвести по (seed, версия контента), не сохраняя сами задания.
+
+def _session_order(rng: random.Random, pool_len: int, n: int) -> list[int]:
+    # без повторов в рамках сессии, если слов хватает; иначе — по кругу
+    return rng.sample(range(pool_len), min(n, pool_len))
+
+
+def _sample_except(rng: random.Random, pool_len: int, k: int, skip: int) -> list[int]:
+    # k разных индексов из range(pool_len) без skip, без копии пула
+    picked = rng.sample(range(pool_len - 1), min(k, pool_len - 1))
+    return [j + 1 if j >= skip else j for j in picked]
+
+
+def _pick_not_in(rng: random.Random, words: tuple[str, ...], taken: list[str]) -> str:
+    for _ in range(8):
+        w = words[rng.randrange(len(words))]
+        if w not in taken:
+            return w
+    return rng.choice([w for w in words if w not in taken] or words)
+
+
+def make_word_flash_items(
+    n: int, difficulty: str, theme_id: int, options_k: int = 4, rng: Optional[random.Random] = None
+) -> list[WordFlashItem]:
+    rng = rng or random.Random()
+    words = current().words(theme_id, difficulty)
+    order = _session_order(rng, len(words), n)
 
     items: list[WordFlashItem] = []
     for i in range(n):
-        target = pool[i % len(pool)]
-        distractors = [w for w in words if w != target]
-        random.shuffle(distractors)
-        options = [target] + distractors[: max(0, options_k - 1)]
-        random.shuffle(options)
-        items.append(WordFlashItem(item_id=f"wf_t{theme_id}_{difficulty}_{i}", target=target, options=options))
+        t = order[i % len(order)]
+        distractors = _sample_except(rng, len(words), max(0, options_k - 1), t)
+        options = [words[t]] + [words[j] for j in distractors]
+        rng.shuffle(options)
+        items.append(WordFlashItem(item_id=f"wf_t{theme_id}_{difficulty}_{i}", target=words[t], options=options))
     return items
-def make_odd_one_out_items(n: int, difficulty: str, theme_id: int, options_k: int = 4) -> list[WordFlashItem]:
+def make_odd_one_out_items(
+    n: int, difficulty: str, theme_id: int, options_k: int = 4, rng: Optional[random.Random] = None
+) -> list[WordFlashItem]:
     """Generate 'odd one out' tasks.
 
     options: list[str] of length options_k (usually 4)
@@ -543,35 +701,35 @@ def make_odd_one_out_items(n: int, difficulty: str, theme_id: int, options_k: in
     if options_k < 3:
         options_k = 3
 
-    base_words = _pool_for(theme_id, difficulty)
-    base_pool = base_words[:]
-    random.shuffle(base_pool)
+    rng = rng or random.Random()
+    idx = current()
+    base_words = idx.words(theme_id, difficulty)
+    group_k = max(2, options_k - 1)
+    # группа i-го задания — подряд идущие позиции i..i+group_k-1 перестановки
+    base_order = rng.sample(range(len(base_words)), min(len(base_words), n + group_k - 1))
 
-    other_theme_ids = [tid for tid in THEMES.keys() if tid != theme_id]
-    if not other_theme_ids:
-        other_theme_ids = [DEFAULT_THEME_ID]
+    other_theme_ids = idx.other_themes(theme_id)
 
     items: list[WordFlashItem] = []
     for i in range(n):
-        group_k = max(2, options_k - 1)
         group = []
+        j = 0
         while len(group) < group_k:
-            w = base_pool[(i + len(group)) % len(base_pool)]
+            w = base_words[base_order[(i + j) % len(base_order)]]
+            j += 1
             if w not in group:
                 group.append(w)
 
-        odd_theme_id = random.choice(other_theme_ids)
-        odd_words = _pool_for(odd_theme_id, difficulty)
-        odd = random.choice([w for w in odd_words if w not in group] or odd_words)
+        odd_theme_id = rng.choice(other_theme_ids)
+        odd = _pick_not_in(rng, idx.words(odd_theme_id, difficulty), group)
 
         options = group + [odd]
         options = list(dict.fromkeys(options))
         while len(options) < options_k:
-            cand = random.choice([w for w in base_words if w not in options] or base_words)
-            options.append(cand)
+            options.append(_pick_not_in(rng, base_words, options))
 
         options = options[:options_k]
-        random.shuffle(options)
+        rng.shuffle(options)
         items.append(
             WordFlashItem(
                 item_id=f"ooo_t{theme_id}_{difficulty}_{i}",
@@ -582,25 +740,24 @@ def make_odd_one_out_items(n: int, difficulty: str, theme_id: int, options_k: in
             )
         )
     return items
-def make_letter_builder_items(n: int, difficulty: str, theme_id: int) -> list[WordFlashItem]:
+def make_letter_builder_items(
+    n: int, difficulty: str, theme_id: int, rng: Optional[random.Random] = None
+) -> list[WordFlashItem]:
     """
     letter_builder:
     - target НЕ показываем (ставим пустую строку)
     - correct = правильное слово (для проверки на фронте)
     - options = перемешанные буквы слова
     """
-    words = _pool_for(theme_id, difficulty)
-    pool = words[:]
-    random.shuffle(pool)
-
-    if len(pool) >= n:
-        pool = pool[:n]
+    rng = rng or random.Random()
+    words = current().words(theme_id, difficulty)
+    order = _session_order(rng, len(words), n)
 
     items: list[WordFlashItem] = []
     for i in range(n):
-        w = pool[i % len(pool)]
+        w = words[order[i % len(order)]]
         letters = list(w)
-        random.shuffle(letters)
+        rng.shuffle(letters)
 
         items.append(
             WordFlashItem(
@@ -613,13 +770,12 @@ def make_letter_builder_items(n: int, difficulty: str, theme_id: int) -> list[Wo
         )
     return items
 
-def _vocab_pool_for(theme_id: int, difficulty: str) -> list[dict]:
-    theme = VOCAB_CATEGORIES.get(theme_id)
-    if not theme:
-        return []
-    return theme.get(difficulty) or theme.get("normal") or []
+def _vocab_pool_for(theme_id: int, difficulty: str) -> tuple[VocabEntry, ...]:
+    return current().vocab(theme_id, difficulty)
 
-def make_vocab_spell_items(n: int, difficulty: str, theme_id: int) -> list[WordFlashItem]:
+def make_vocab_spell_items(
+    n: int, difficulty: str, theme_id: int, rng: Optional[random.Random] = None
+) -> list[WordFlashItem]:
     """
     vocab_spell:
     - prompt = слово с пропущенной буквой, например: вел_сипед
@@ -627,35 +783,26 @@ def make_vocab_spell_items(n: int, difficulty: str, theme_id: int) -> list[WordF
     - target = НЕ показываем
     - correct = правильная буква
     """
+    rng = rng or random.Random()
     rows = _vocab_pool_for(theme_id, difficulty)
     if not rows:
-        return make_word_flash_items(n, difficulty, DEFAULT_THEME_ID, options_k=4)
+        return make_word_flash_items(n, difficulty, DEFAULT_THEME_ID, options_k=4, rng=rng)
 
-    pool = rows[:]
-    random.shuffle(pool)
-
-    if len(pool) >= n:
-        pool = pool[:n]
+    order = _session_order(rng, len(rows), n)
 
     items: list[WordFlashItem] = []
     for i in range(n):
-        row = pool[i % len(pool)]
-        word = row["word"]
-        miss_idx = row["missing_index"]
-        correct = word[miss_idx]
-        options = list(dict.fromkeys([correct] + row["options"]))
-        random.shuffle(options)
-
-        masked = word[:miss_idx] + "_" + word[miss_idx + 1:]
+        row = rows[order[i % len(order)]]
+        options = list(row.options)
+        rng.shuffle(options)
 
         items.append(
             WordFlashItem(
                 item_id=f"vs_t{theme_id}_{difficulty}_{i}",
                 target="",           # слово заранее не показываем
                 options=options,     # варианты букв
-                prompt=masked,       # показываем слово с пропуском
-                correct=correct,     # правильная буква
+                prompt=row.masked,   # показываем слово с пропуском
+                correct=row.correct, # правильная буква
             )
         )
     return items
-
@@ -0,0 +1,118 @@
+"""Пул заранее сгенерированных колод для start_session.
+
+Колоды лежат по ключу (версия контента, mode, theme, difficulty, n, options_k).
+start_session забирает готовую колоду за O(1); на промахе колода генерируется
+на месте, а ключ ставится в очередь фонового потока, который доливает пул
+до DECK_POOL_DEPTH колод. Ключей немного (режимы × темы × уровни), поэтому на
+старте воркера и после смены контента в очередь ставятся сразу все — первый
+урок после рестарта не упирается в генерацию на месте.
+"""
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from typing import Callable, Hashable, Iterable
+
+# сколько готовых колод держать на ключ (0 — пул выключен)
+DECK_POOL_DEPTH = int(os.getenv("DECK_POOL_DEPTH", "8"))
+
+log = logging.getLogger("reading_game.deck_pool")
+
+
+class DeckPool:
+    def __init__(self, generate: Callable[[Hashable], list], depth: int = DECK_POOL_DEPTH):
+        self._generate = generate
+        self.depth = depth
+        self._decks: dict[Hashable, deque] = {}
+        self._pending: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._queue: "queue.SimpleQueue[Hashable | None]" = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def pop(self, key: Hashable) -> list:
+        deck = None
+        with self._lock:
+            decks = self._decks.get(key)
+            if decks:
+                deck = decks.popleft()
+                self.hits += 1
+            else:
+                self.misses += 1
+            refill = self.depth > 0 and key not in self._pending
+            if refill:
+                self._pending.add(key)
+
+        if refill:
+            self._queue.put(key)
+        if deck is None:
+            deck = self._generate(key)
+        return deck
+
+    def warm(self, keys: Iterable[Hashable]) -> None:
+        """Поставить ключи в очередь долива, не дожидаясь первого промаха."""
+        if self.depth <= 0:
+            return
+        with self._lock:
+            fresh = [k for k in dict.fromkeys(keys) if k not in self._pending]
+            self._pending.update(fresh)
+        for key in fresh:
+            self._queue.put(key)
+
+    def clear(self) -> None:
+        # например, после перезагрузки контента: старые колоды больше не нужны
+        with self._lock:
+            self._decks.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "depth": self.depth,
+                "keys": len(self._decks),
+                "decks": sum(len(d) for d in self._decks.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+    # ---- фоновый долив ----
+
+    def start(self, keys: Iterable[Hashable] = ()) -> None:
+        if self.depth <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="deck-pool", daemon=True)
+        self._thread.start()
+        self.warm(keys)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _fill(self, key: Hashable) -> None:
+        while True:
+            with self._lock:
+                have = len(self._decks.get(key, ()))
+            if have >= self.depth:
+                return
+            deck = self._generate(key)
+            with self._lock:
+                self._decks.setdefault(key, deque()).append(deck)
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            try:
+                self._fill(key)
+            except Exception:
+                log.exception("deck pool refill failed for %r", key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
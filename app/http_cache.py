@@ -0,0 +1,101 @@
+"""Готовые тела ответов для справочников и условные запросы (ETag / 304).
+
+Каталоги (темы, список достижений) меняются только при загрузке словаря или
+seed, поэтому сериализуются один раз на снимок: SnapshotCache держит
+результат для конкретного объекта-источника (ContentIndex, каталог
+достижений) и пересобирает его, как только источник подменили.
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from fastapi import Response
+
+# сколько секунд клиент может не перепроверять каталог; дальше — If-None-Match
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Body:
+    content: bytes
+    etag: str
+
+
+def dumps(payload: Any) -> bytes:
+    # как JSONResponse в FastAPI: компактно, UTF-8 без \u-экранирования
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(*parts: bytes) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p)
+        h.update(b"\0")
+    return '"' + h.hexdigest()[:20] + '"'
+
+
+def json_body(payload: Any) -> Body:
+    content = dumps(payload)
+    return Body(content, make_etag(content))
+
+
+class SnapshotCache(Generic[T]):
+    """Значение render(src), пересчитываемое только при смене объекта src."""
+
+    def __init__(self, render: Callable[[Any], T]):
+        self._render = render
+        self._entry: Optional[tuple[Any, T]] = None
+        self._lock = threading.Lock()
+
+    def get(self, src: Any) -> T:
+        entry = self._entry
+        if entry is not None and entry[0] is src:
+            return entry[1]
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] is not src:
+                entry = (src, self._render(src))
+                self._entry = entry
+        return entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entry = None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def respond(
+    if_none_match: Optional[str],
+    body: Body,
+    cache_control: str = f"public, max-age={CATALOG_MAX_AGE}, must-revalidate",
+) -> Response:
+    if etag_matches(if_none_match, body.etag):
+        return not_modified(body.etag, cache_control)
+    return Response(
+        content=body.content,
+        media_type="application/json",
+        headers={"ETag": body.etag, "Cache-Control": cache_control},
+    )
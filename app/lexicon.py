@@ -0,0 +1,174 @@
+"""Хранилище словаря (тем и словарных слов).
+
+Два источника с одним интерфейсом:
+
+* DictStore — словари в памяти (встроенные THEMES / VOCAB_CATEGORIES);
+* PackStore — упакованный файл на диске, открытый через mmap. При открытии
+  читается только маленький заголовок (id, название, смещение каждой темы),
+  сама тема декодируется при первом обращении.
+
+Формат pack-файла:
+
+    RGLEX1 <длина заголовка>\\n
+    <заголовок JSON>
+    <JSON темы 1><JSON темы 2>...
+
+Сборка pack-файла (по умолчанию — из встроенного контента, либо из JSON
+вида {"themes": {id: {...}}, "vocab": {id: {...}}}):
+
+    python -m app.lexicon build content/lexicon.pack [--source lexicon.json]
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+from typing import Optional
+
+MAGIC = b"RGLEX1"
+
+KIND_WORDS = "words"
+KIND_VOCAB = "vocab"
+
+
+def dict_version(themes: dict, vocab: dict) -> str:
+    """Версия контента из словарей — хэш их содержимого, как у pack-файла.
+
+    Правка THEMES / VOCAB_CATEGORIES меняет версию, и колода старой сессии
+    не пересобирается по seed из другого контента (GET /items отвечает 409).
+    """
+    blob = json.dumps(
+        {KIND_WORDS: themes, KIND_VOCAB: vocab}, ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+
+class DictStore:
+    """Контент из словарей в памяти."""
+
+    def __init__(self, themes: dict, vocab: dict, version: Optional[str] = None):
+        self._themes = themes
+        self._vocab = vocab
+        self.version = version or dict_version(themes, vocab)
+
+    def header(self) -> list[dict]:
+        words = [{"id": tid, "name": t["name"], "kind": KIND_WORDS} for tid, t in sorted(self._themes.items())]
+        vocab = [{"id": tid, "name": t["name"], "kind": KIND_VOCAB} for tid, t in sorted(self._vocab.items())]
+        return words + vocab
+
+    def theme(self, theme_id: int) -> Optional[dict]:
+        return self._themes.get(theme_id)
+
+    def vocab(self, theme_id: int) -> Optional[dict]:
+        return self._vocab.get(theme_id)
+
+
+class PackStore:
+    """Pack-файл на диске: заголовок читается сразу, темы — лениво из mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            first = f.readline()
+            if not first.startswith(MAGIC + b" "):
+                raise ValueError(f"{path}: not a lexicon pack")
+            header_len = int(first[len(MAGIC) + 1:])
+            head = json.loads(f.read(header_len))
+            self._body_start = len(first) + header_len
+            # старый mmap остаётся валидным после os.replace — старые ссылки дочитают свою версию
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.version = head["version"]
+        self._entries = {(e["kind"], e["id"]): e for e in head["themes"]}
+        self._decoded: dict[tuple[str, int], dict] = {}
+
+    def header(self) -> list[dict]:
+        return [
+            {"id": e["id"], "name": e["name"], "kind": e["kind"]}
+            for e in sorted(self._entries.values(), key=lambda e: (e["kind"] != KIND_WORDS, e["id"]))
+        ]
+
+    def _load(self, kind: str, theme_id: int) -> Optional[dict]:
+        key = (kind, theme_id)
+        data = self._decoded.get(key)
+        if data is None:
+            e = self._entries.get(key)
+            if e is None:
+                return None
+            start = self._body_start + e["offset"]
+            data = json.loads(self._mm[start:start + e["length"]])
+            data["name"] = e["name"]
+            self._decoded[key] = data
+        return data
+
+    def theme(self, theme_id: int) -> Optional[dict]:
+        return self._load(KIND_WORDS, theme_id)
+
+    def vocab(self, theme_id: int) -> Optional[dict]:
+        return self._load(KIND_VOCAB, theme_id)
+
+
+def open_store(path: str) -> PackStore:
+    return PackStore(path)
+
+
+def build_pack(path: str, themes: dict, vocab: dict) -> str:
+    """Записать pack-файл атомарно (tmp + os.replace). Возвращает версию."""
+    entries = []
+    blobs = []
+    offset = 0
+    for kind, source in ((KIND_WORDS, themes), (KIND_VOCAB, vocab)):
+        for tid, theme in sorted(source.items(), key=lambda kv: int(kv[0])):
+            body = {k: v for k, v in theme.items() if k != "name"}
+            blob = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            entries.append({"id": int(tid), "name": theme["name"], "kind": kind, "offset": offset, "length": len(blob)})
+            blobs.append(blob)
+            offset += len(blob)
+
+    body = b"".join(blobs)
+    digest = hashlib.sha256(json.dumps(entries, ensure_ascii=False).encode("utf-8"))
+    digest.update(body)
+    version = digest.hexdigest()[:12]
+    head = json.dumps({"version": version, "themes": entries}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".lexicon-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + b" " + str(len(head)).encode("ascii") + b"\n")
+            f.write(head)
+            f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return version
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.lexicon")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="собрать pack-файл")
+    b.add_argument("out")
+    b.add_argument("--source", help="JSON {themes, vocab}; по умолчанию — встроенный контент")
+    args = ap.parse_args(argv[1:])
+
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            src = json.load(f)
+        themes, vocab = src.get("themes", {}), src.get("vocab", {})
+    else:
+        from .content import THEMES, VOCAB_CATEGORIES
+        themes, vocab = THEMES, VOCAB_CATEGORIES
+
+    version = build_pack(args.out, themes, vocab)
+    print(f"{args.out}: version {version}, {len(themes)} themes, {len(vocab)} vocab categories")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,20 +1,33 @@
-from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import ValidationError
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from fastapi.responses import FileResponse
-from sqlalchemy import select, func
-
-from .db import Base, engine, get_db
-from . import models, schemas
+from sqlalchemy import func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from .db import engine, get_db, run_db, SessionLocal
+from . import models, schemas, stats, migrations, content, achievements, http_cache, metrics, audio, queries
+from .assets import AssetFiles
+from .attempt_buffer import AttemptBuffer
+from .deck_pool import DeckPool
+from .session_cache import ActiveSession, make_cache
 from .content import make_word_flash_items
 from .content import (
     make_word_flash_items,
     make_odd_one_out_items,
     make_letter_builder_items,
     make_vocab_spell_items,
-    list_all_categories,
     DEFAULT_THEME_ID,
 )
 
@@ -24,53 +37,159 @@ DIFF_PRESETS = {
     "hard":   {"exposure": 900,  "min": 500,  "max": 1400, "items": 10, "options": 5, "step": 150},
 }
 
+# пресеты, с которыми реально стартуют сессии (в start_session и при
+# восстановлении колоды по seed)
+START_PRESETS = {
+    "easy": {"exposure": 1500, "min": 1100, "max": 2000, "items": 6, "options": 3, "step": 120},
+    "normal": {"exposure": 1200, "min": 800, "max": 1800, "items": 7, "options": 4, "step": 150},
+    "hard": {"exposure": 900, "min": 500, "max": 1400, "items": 9, "options": 5, "step": 150},
+}
+
 SURVIVAL_LIVES = {
     "easy": 4,
     "normal": 3,
     "hard": 2,
 }
 
-app = FastAPI(title="Reading Game API")
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# WebSocket-канал игры: ответы копятся и пишутся одной транзакцией раз в
+# WS_FLUSH_MS мс, по WS_FLUSH_ROWS строк или перед финишем
+WS_FLUSH_MS = int(os.getenv("WS_FLUSH_MS", "1000"))
+WS_FLUSH_ROWS = int(os.getenv("WS_FLUSH_ROWS", "20"))
+
+# офлайн-выгрузка: сколько игр принимается одним запросом
+UPLOAD_MAX_SESSIONS = int(os.getenv("UPLOAD_MAX_SESSIONS", "50"))
+# сколько ответов принимается одной пачкой (/attempts и одна игра в выгрузке);
+# в раунде меньше десятка слов
+ATTEMPTS_MAX_BATCH = int(os.getenv("ATTEMPTS_MAX_BATCH", "100"))
+
+# токен для /api/admin/*; если не задан — админ-эндпоинты выключены
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+log = logging.getLogger("reading_game")
+
+
+def _reload_content():
+    idx = content.reload()
+    deck_pool.clear()
+    deck_pool.warm(_deck_keys(idx))
+    return idx
+
+
+async def _watch_lexicon():
+    # горячая перезагрузка словаря без рестарта воркера
+    while True:
+        await asyncio.sleep(content.LEXICON_WATCH_SECONDS)
+        try:
+            if content.lexicon_changed():
+                idx = await run_in_threadpool(_reload_content)
+                log.info("lexicon reloaded: version %s", idx.version)
+        except Exception:
+            log.exception("lexicon reload failed, keeping current content")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if content.LEXICON_PATH and content.LEXICON_WATCH_SECONDS > 0:
+        tasks.append(asyncio.create_task(_watch_lexicon()))
+    deck_pool.start(_deck_keys(content.current()))
+    attempt_buffer.start()
+    yield
+    # дописать отложенные ответы до остановки
+    await run_in_threadpool(attempt_buffer.stop)
+    deck_pool.stop()
+    for t in tasks:
+        t.cancel()
+
+
+app = FastAPI(title="Reading Game API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+# статика: собранные файлы (python -m app.assets build) — с хэшами в именах,
+# AVIF/WebP и предсжатием; без сборки — исходники как есть
+static_files = AssetFiles("static")
+app.mount("/static", static_files, name="static")
 
 @app.get("/")
-def root():
-    return FileResponse("static/index.html")
-# Создать таблицы (для MVP ок; позже — миграции Alembic)
-Base.metadata.create_all(bind=engine)
+def root(request: Request):
+    return static_files.index_response(request.scope)
+# Создать таблицы и применить миграции схемы (app/migrations.py)
+migrations.upgrade(engine)
 def seed_achievements():
     with next(get_db()) as db:
-        existing = db.query(models.Achievement).count()
-        if existing > 0:
-            return
+        achievements.seed(db)
 
-        rows = [
-            ("streak_5", "Серия 5", "5 правильных подряд", "🔥"),
-            ("perfect_game", "Идеально", "100% точность за игру", "🎯"),
-            ("fast_2000", "Молния", "Средняя реакция быстрее 2000 мс", "⚡"),
-            ("games_10", "Опытный", "Сыграно 10 игр", "🏆"),
-            ("words_100", "Читатель", "Прочитано 100 слов", "📘"),
-        ]
-
-        for code, title, desc, icon in rows:
-            db.add(models.Achievement(
-                code=code,
-                title=title,
-                description=desc,
-                icon=icon
-            ))
+seed_achievements()
+# тело /api/themes сериализуется один раз на версию контента
+_themes_body = http_cache.SnapshotCache(lambda idx: http_cache.json_body(idx.categories()))
 
-        db.commit()
 
-seed_achievements()
 @app.get("/api/themes")
-def get_themes():
-    return list_all_categories()
+async def get_themes(if_none_match: Optional[str] = Header(None)):
+    return http_cache.respond(if_none_match, _themes_body.get(content.current()))
 
-@app.post("/api/children", response_model=schemas.ChildOut)
-def create_child(payload: schemas.ChildCreate, db: Session = Depends(get_db)):
+
+def _render_audio_sprites(_asset_manifest) -> Optional[http_cache.Body]:
+    # URL спрайтов — через static_files: после app.assets build это хэшированные имена
+    sprites = audio.load(static_files.directory)
+    if sprites is None:
+        return None
+    return http_cache.json_body({
+        cat: {"url": static_files.url(e["file"]), "clips": e["clips"]}
+        for cat, e in sprites["categories"].items()
+    })
+
+
+# пересобирается вместе с манифестом статики (static_files.reload)
+_audio_sprites_body = http_cache.SnapshotCache(_render_audio_sprites)
+
+
+@app.get("/api/audio/sprites")
+async def get_audio_sprites(if_none_match: Optional[str] = Header(None)):
+    body = _audio_sprites_body.get(static_files.manifest)
+    if body is None:
+        raise HTTPException(404, "Audio sprites are not built (python -m app.audio build)")
+    return http_cache.respond(if_none_match, body)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "Admin API is disabled")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(403, "Bad admin token")
+
+
+@app.post("/api/admin/content/reload", dependencies=[Depends(require_admin)])
+async def reload_content():
+    """Перезагрузить словарь в этом процессе. С несколькими воркерами остальные
+    подхватят новый pack своим наблюдателем (READING_GAME_LEXICON_WATCH), иначе
+    версии контента разойдутся и /items ответит 409 на чужом воркере."""
+    try:
+        idx = await run_in_threadpool(_reload_content)
+    except (OSError, ValueError) as e:
+        raise HTTPException(422, f"Content reload failed: {e}")
+    return {"ok": True, "version": idx.version, "categories": len(idx.categories())}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/admin/deck-pool", dependencies=[Depends(require_admin)])
+async def get_deck_pool_stats():
+    return deck_pool.stats()
+
+
+@app.get("/api/admin/session-cache", dependencies=[Depends(require_admin)])
+async def get_session_cache_stats():
+    return active_sessions.stats()
+
+
+@app.get("/api/admin/attempt-buffer", dependencies=[Depends(require_admin)])
+async def get_attempt_buffer_stats():
+    return attempt_buffer.stats()
+
+def _create_child(db: Session, payload: schemas.ChildCreate):
     child = models.Child(name=payload.name.strip())
     db.add(child)
     db.commit()
@@ -78,83 +197,157 @@ def create_child(payload: schemas.ChildCreate, db: Session = Depends(get_db)):
     return child
 
 
-@app.get("/api/children", response_model=list[schemas.ChildOut])
-def list_children(db: Session = Depends(get_db)):
+@app.post("/api/children", response_model=schemas.ChildOut)
+async def create_child(payload: schemas.ChildCreate):
+    return await run_db(_create_child, payload)
+
+
+def _list_children(db: Session):
     return db.query(models.Child).order_by(models.Child.id.desc()).all()
 
 
-@app.post("/api/sessions/start", response_model=schemas.SessionStartOut)
-def start_session(payload: schemas.SessionStartIn, db: Session = Depends(get_db)):
-    theme_id = payload.theme_id or DEFAULT_THEME_ID
-    DIFF_PRESETS = {
-        "easy": {"exposure": 1500, "min": 1100, "max": 2000, "items": 6, "options": 3, "step": 120},
-        "normal": {"exposure": 1200, "min": 800, "max": 1800, "items": 7, "options": 4, "step": 150},
-        "hard": {"exposure": 900, "min": 500, "max": 1400, "items": 9, "options": 5, "step": 150},
-    }
-    child = db.get(models.Child, payload.child_id)
-    if not child:
-        raise HTTPException(404, "Child not found")
-    preset = DIFF_PRESETS[payload.difficulty]
-    exposure_ms = preset["exposure"]
-    items_total = preset["items"]
-    options_k = preset["options"]
-
-    last = (
-        db.query(models.Session)
-        .filter(
-            models.Session.child_id == child.id,
-            models.Session.mode == payload.mode,
-            models.Session.difficulty == payload.difficulty,
-            models.Session.finished_at.isnot(None),
-        )
-        .order_by(models.Session.id.desc())
-        .first()
-    )
-    if last:
-        exposure_ms = int(last.exposure_ms)
+@app.get("/api/children", response_model=list[schemas.ChildOut])
+async def list_children():
+    return await run_db(_list_children)
 
-    # clamp в рамках уровня
-    exposure_ms = max(preset["min"], min(preset["max"], exposure_ms))
 
-    session = models.Session(
-        child_id=child.id,
-        mode=payload.mode,
-        difficulty=payload.difficulty,
-        theme_id=theme_id,
-        exposure_ms=exposure_ms,
-        items_total=items_total,
-    )
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+def _make_items(mode: str, n: int, difficulty: str, theme_id: int, options_k: int, seed: int):
+    t0 = time.perf_counter()
+    try:
+        return _generate_items(mode, n, difficulty, theme_id, options_k, random.Random(seed))
+    finally:
+        metrics.generation_latency.observe(time.perf_counter() - t0, mode)
 
-    if payload.mode == "odd_one_out":
-        items = make_odd_one_out_items(
-            items_total,
-            difficulty=payload.difficulty,
+
+def _generate_items(mode: str, n: int, difficulty: str, theme_id: int, options_k: int, rng: random.Random):
+    if mode == "odd_one_out":
+        return make_odd_one_out_items(
+            n,
+            difficulty=difficulty,
             theme_id=theme_id,
             options_k=options_k,
+            rng=rng,
         )
-    elif payload.mode == "letter_builder":
-        items = make_letter_builder_items(
-            items_total,
-            difficulty=payload.difficulty,
+    elif mode == "letter_builder":
+        return make_letter_builder_items(
+            n,
+            difficulty=difficulty,
             theme_id=theme_id,
+            rng=rng,
         )
-    elif payload.mode == "vocab_spell":
-        items = make_vocab_spell_items(
-            items_total,
-            difficulty=payload.difficulty,
+    elif mode == "vocab_spell":
+        return make_vocab_spell_items(
+            n,
+            difficulty=difficulty,
             theme_id=theme_id,
+            rng=rng,
         )
     else:
-        items = make_word_flash_items(
-            items_total,
-            difficulty=payload.difficulty,
+        return make_word_flash_items(
+            n,
+            difficulty=difficulty,
             theme_id=theme_id,
             options_k=options_k,
+            rng=rng,
         )
 
+
+def _generate_deck(key) -> tuple[int, list]:
+    _version, mode, theme_id, difficulty, n, options_k = key
+    seed = random.getrandbits(31)
+    return seed, _make_items(mode, n, difficulty, theme_id, options_k, seed)
+
+
+def _deck_key(version: str, mode: str, theme_id: int, difficulty: str) -> tuple:
+    preset = START_PRESETS[difficulty]
+    return (version, mode, theme_id, difficulty, preset["items"], preset["options"])
+
+
+def _deck_keys(idx) -> list[tuple]:
+    """Все ключи пула для версии контента: vocab_spell — по словарным категориям, остальное — по темам."""
+    theme_ids = [t["id"] for t in idx.themes()]
+    words = set(theme_ids)
+    vocab_ids = [c["id"] for c in idx.categories() if c["id"] not in words]
+    return [
+        _deck_key(idx.version, mode, theme_id, difficulty)
+        for mode in MODE_ORDER
+        for theme_id in (vocab_ids if mode == "vocab_spell" else theme_ids)
+        for difficulty in START_PRESETS
+    ]
+
+
+# готовые колоды для start_session, доливаются фоновым потоком
+deck_pool = DeckPool(_generate_deck)
+
+# состояние идущих игр для ответов и финиша (app/session_cache.py)
+active_sessions = make_cache()
+
+
+def _late_attempts(db: Session, inserted, closed: dict) -> None:
+    """Дописать в rollup ответы, легшие в уже закрытые сессии.
+
+    Rollup пополняется при закрытии сессии; ответ, пришедший позже (HTTP после
+    финиша, выгрузка в закрытую игру, переотправка, устаревший кэш воркера),
+    иначе попал бы в attempts мимо статистики. inserted — (session_id,
+    correct, reaction_ms) реально вставленных строк, closed — {id: сессия}.
+    """
+    totals: dict[int, list[int]] = {}
+    for session_id, correct, reaction_ms in inserted:
+        if session_id in closed:
+            t = totals.setdefault(session_id, [0, 0, 0])
+            t[0] += 1
+            t[1] += correct
+            t[2] += reaction_ms
+    for session_id, (n, correct, reaction_ms) in totals.items():
+        stats.record_late_attempts(db, closed[session_id], n, correct, reaction_ms)
+
+
+def _insert_attempts(db: Session, rows: list[dict], check_closed: bool = True) -> list:
+    """INSERT ответов; возвращает (session_id, correct, reaction_ms) вставленных строк.
+
+    check_closed: после INSERT, в той же пишущей транзакции, прочитать закрытые
+    сессии пачки под блокировкой (FOR SHARE на PostgreSQL; SQLite держит
+    блокировку записи с первого INSERT) — финиш, закрывающий сессию, либо уже
+    закоммичен и виден здесь, либо ждёт нашего коммита и посчитает ответы сам.
+    Survival проверяет это своим UPDATE строки сессии.
+    """
+    if not rows:
+        return []
+
+    # ответ с уже записанным client_id молча пропускается (уникальный индекс);
+    # RETURNING отдаёт только вставленные строки — SELECT по client_id не нужен
+    A = models.Attempt
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(A).on_conflict_do_nothing().returning(A.session_id, A.correct, A.reaction_ms)
+        inserted = db.execute(stmt, rows).all()
+    else:
+        db.execute(insert(A), rows)
+        inserted = [(r["session_id"], r["correct"], r["reaction_ms"]) for r in rows]
+
+    if check_closed and inserted:
+        closed = {s.id: s for s in db.scalars(queries.closed_sessions(sid for sid, _, _ in inserted))}
+        if closed:
+            _late_attempts(db, inserted, closed)
+    return inserted
+
+
+def _write_attempts(rows: list[dict]) -> None:
+    with SessionLocal() as db:
+        _insert_attempts(db, rows)
+        db.commit()
+
+
+# отложенная запись ответов с групповым коммитом (app/attempt_buffer.py)
+attempt_buffer = AttemptBuffer(_write_attempts)
+
+
+def _session_start_out(
+    session: models.Session,
+    items: list,
+    lives_left: Optional[int] = None,
+) -> schemas.SessionStartOut:
     out_items = [
         schemas.WordFlashPayload(
             item_id=i.item_id,
@@ -168,82 +361,270 @@ def start_session(payload: schemas.SessionStartIn, db: Session = Depends(get_db)
     ]
 
     lives_start = None
-    lives_left = None
-    if payload.mode == "survival":
-        lives_start = SURVIVAL_LIVES.get(payload.difficulty, 3)
-        lives_left = lives_start
+    if session.mode == "survival":
+        lives_start = SURVIVAL_LIVES.get(session.difficulty, 3)
+        if lives_left is None:
+            lives_left = lives_start
 
     return schemas.SessionStartOut(
         session_id=session.id,
-        mode=payload.mode,
+        mode=session.mode,
         exposure_ms=session.exposure_ms,
         items_total=session.items_total,
         items=out_items,
-        difficulty=payload.difficulty,
-        theme_id=theme_id,
+        difficulty=session.difficulty,
+        theme_id=session.theme_id,
         lives_start=lives_start,
         lives_left=lives_left,
     )
 
 
-@app.post("/api/sessions/{session_id}/attempt")
-def submit_attempt(session_id: int, payload: schemas.AttemptIn, db: Session = Depends(get_db)):
-    session = db.get(models.Session, session_id)
-    if not session:
-        raise HTTPException(404, "Session not found")
+def _clamp_exposure(difficulty: str, exposure_ms: int) -> int:
+    preset = START_PRESETS[difficulty]
+    return max(preset["min"], min(preset["max"], int(exposure_ms)))
 
-    a = models.Attempt(
-        session_id=session.id,
-        item_id=payload.item_id,
-        correct=1 if payload.correct else 0,
-        reaction_ms=max(0, payload.reaction_ms),
-        shown_ms=max(0, payload.shown_ms),
+
+def _start_exposure(db: Session, child_id: int, mode: str, difficulty: str) -> int:
+    """Экспозиция новой игры: как в последней завершённой игре того же режима и уровня."""
+    last = db.scalars(queries.last_finished_session(child_id, mode, difficulty)).first()
+    # clamp в рамках уровня
+    return _clamp_exposure(difficulty, last.exposure_ms if last else START_PRESETS[difficulty]["exposure"])
+
+
+def _new_session(
+    db: Session, child_id: int, mode: str, difficulty: str, theme_id: int, exposure_ms: int,
+) -> tuple[models.Session, list]:
+    """Сессия с колодой из пула; в БД — flush, коммит и кэш на вызывающем."""
+    content_version = content.current().version
+    seed, items = deck_pool.pop(_deck_key(content_version, mode, theme_id, difficulty))
+
+    session = models.Session(
+        child_id=child_id,
+        mode=mode,
+        difficulty=difficulty,
+        theme_id=theme_id,
+        exposure_ms=exposure_ms,
+        items_total=START_PRESETS[difficulty]["items"],
+        rng_seed=seed,
+        content_version=content_version,
+        lives_left=SURVIVAL_LIVES.get(difficulty, 3) if mode == "survival" else None,
     )
-    db.add(a)
-    db.commit()
+    db.add(session)
+    db.flush()
+    return session, items
 
-    # ---- SURVIVAL логика ----
-    if session.mode == "survival":
-        lives_start = SURVIVAL_LIVES.get(session.difficulty, 3)
 
-        wrong_count = (
-            db.query(models.Attempt)
-            .filter(models.Attempt.session_id == session.id, models.Attempt.correct == 0)
-            .count()
-        )
+def _start_session(db: Session, payload: schemas.SessionStartIn):
+    theme_id = payload.theme_id or DEFAULT_THEME_ID
+    child = db.get(models.Child, payload.child_id)
+    if not child:
+        raise HTTPException(404, "Child not found")
+    exposure_ms = _start_exposure(db, child.id, payload.mode, payload.difficulty)
 
-        lives_left = max(0, lives_start - wrong_count)
+    session, items = _new_session(db, child.id, payload.mode, payload.difficulty, theme_id, exposure_ms)
+    db.commit()
+    db.refresh(session)
+    active_sessions.put(ActiveSession.from_row(session))
 
-        finished = False
-        if lives_left <= 0:
-            session.finished_at = datetime.utcnow()
-            db.commit()
-            finished = True
+    return _session_start_out(session, items)
 
-        return {"ok": True, "mode": "survival", "lives_left": lives_left, "finished": finished}
 
-    return {"ok": True}
+@app.post("/api/sessions/start", response_model=schemas.SessionStartOut)
+async def start_session(payload: schemas.SessionStartIn):
+    return await run_db(_start_session, payload)
 
 
-@app.post("/api/sessions/{session_id}/finish", response_model=schemas.SessionFinishOut)
-def finish_session(session_id: int, db: Session = Depends(get_db)):
+def _get_session_items(db: Session, session_id: int):
+    """Колода сессии заново по seed — для продолжения после перезагрузки и аудита."""
     session = db.get(models.Session, session_id)
     if not session:
         raise HTTPException(404, "Session not found")
-
-    attempts = (
-        db.query(models.Attempt)
-        .filter(models.Attempt.session_id == session.id)
-        .all()
+    if session.rng_seed is None:
+        raise HTTPException(409, "Session was started without a seed")
+    if session.content_version != content.current().version:
+        raise HTTPException(409, "Content has changed since the session started")
+
+    preset = START_PRESETS.get(session.difficulty, START_PRESETS["normal"])
+    items = _make_items(
+        session.mode,
+        session.items_total,
+        session.difficulty,
+        session.theme_id,
+        preset["options"],
+        session.rng_seed,
     )
 
+    return _session_start_out(session, items, session.lives_left)
+
+
+@app.get("/api/sessions/{session_id}/items", response_model=schemas.SessionStartOut)
+async def get_session_items(session_id: int):
+    return await run_db(_get_session_items, session_id)
+
+
+def _attempt_row(session_id: int, payload: schemas.AttemptIn) -> dict:
+    return {
+        "session_id": session_id,
+        "item_id": payload.item_id,
+        "correct": 1 if payload.correct else 0,
+        "reaction_ms": max(0, payload.reaction_ms),
+        "shown_ms": max(0, payload.shown_ms),
+        "client_id": payload.client_id,
+    }
+
+
+def _active_session(db: Session, session_id: int) -> ActiveSession:
+    state = active_sessions.get(session_id)
+    if state is None:
+        row = db.get(models.Session, session_id)
+        if not row:
+            raise HTTPException(404, "Session not found")
+        state = ActiveSession.from_row(row)
+        if row.finished_at is None:
+            active_sessions.put(state)
+    return state
+
+
+def _close_session(db: Session, state: ActiveSession, finished_at: Optional[datetime] = None) -> bool:
+    """Закрыть сессию, если ещё открыта. Коммит — на вызывающем.
+
+    Итоги для rollup вызывающий читает уже после этого UPDATE: строка сессии
+    заблокирована, и ответ, который успеет закоммититься, увидит её закрытой
+    и сам допишет себя в rollup (_insert_attempts).
+    """
+    S = models.Session
+    closed = db.execute(
+        update(S)
+        .where(S.id == state.id, S.finished_at.is_(None))
+        .values(finished_at=finished_at or datetime.utcnow())
+        .returning(S.id)
+    ).first()
+    return closed is not None
+
+
+def _survival_state(
+    db: Session, state: ActiveSession, inserted: list, finished_at: Optional[datetime] = None,
+) -> tuple[dict, ActiveSession, bool]:
+    # ---- SURVIVAL логика ----
+    # inserted — только что записанные ответы. Счётчики живут в строке сессии:
+    # один UPDATE ... RETURNING в той же транзакции, что и INSERT ответов, без
+    # чтения attempts. Коммит делает вызывающий.
+    # Жизни всегда берутся из строки, даже без ошибок: кэш процесса не видит
+    # ответов, записанных другими воркерами. Тот же UPDATE блокирует строку и
+    # отдаёт finished_at — проверка «сессия уже закрыта» без отдельного SELECT.
+    lives_start = SURVIVAL_LIVES.get(state.difficulty, 3)
+    wrong = sum(1 for _, correct, _ in inserted if not correct)
+    wrong_count, lives_left, closed_at = db.execute(
+        queries.survival_lives_update(state.id, wrong, lives_start)
+    ).one()
+    state = replace(state, wrong_count=wrong_count, lives_left=lives_left)
+    if closed_at is not None:
+        _late_attempts(db, inserted, {state.id: state})
+
+    lives_left = max(0, lives_left)
+    finished = closed_at is not None or lives_left <= 0
+    # died — сессию закрыл именно этот вызов (а не раньше, другим запросом)
+    died = closed_at is None and finished and _close_session(db, state, finished_at=finished_at)
+    if died:
+        stats.record_session(db, state, *stats.session_totals(db, state.id))
+
+    return {"ok": True, "mode": "survival", "lives_left": lives_left, "finished": finished}, state, died
+
+
+def _record_attempts(
+    db: Session, session_id: int, payload: list[schemas.AttemptIn], finished_at: Optional[datetime] = None,
+) -> dict:
+    state = _active_session(db, session_id)
+    survival = state.mode == "survival"
+
+    # повторы (по client_id) не пишутся и не отнимают жизни второй раз
+    inserted = _insert_attempts(db, [_attempt_row(state.id, p) for p in payload], check_closed=not survival)
+
+    out = {"ok": True}
+    wrong = 0
+    died = False
+    if survival:
+        wrong = sum(1 for _, correct, _ in inserted if not correct)
+        out, state, died = _survival_state(db, state, inserted, finished_at)
+    out["inserted"] = len(inserted)
+
+    db.commit()
+    # в кэш и метрики — только закоммиченное
+    if state.mode == "survival":
+        metrics.survival_lives_lost.inc(amount=wrong)
+    if out.get("finished"):
+        active_sessions.evict(state.id)
+        if died:
+            metrics.survival_deaths.inc()
+            metrics.sessions_finished.inc(state.mode)
+    elif state.mode == "survival":
+        active_sessions.put(state)
+    return out
+
+
+async def _buffer_attempts(
+    session_id: int, payload: list[schemas.AttemptIn], wait: bool = False,
+) -> Optional[dict]:
+    """Ответы через write-behind буфер; None — режим survival, пишем напрямую.
+    wait=True — дождаться коммита пачки и в режиме immediate."""
+    state = await run_db(_active_session, session_id)
+    if state.mode == "survival":
+        return None
+    if payload:
+        fut = attempt_buffer.add([_attempt_row(state.id, p) for p in payload], wait=wait)
+        if fut is not None:
+            await asyncio.wrap_future(fut)
+    return {"ok": True}
+
+
+def _submit_attempt(db: Session, session_id: int, payload: schemas.AttemptIn):
+    return _record_attempts(db, session_id, [payload])
+
+
+@app.post("/api/sessions/{session_id}/attempt")
+async def submit_attempt(session_id: int, payload: schemas.AttemptIn):
+    if attempt_buffer.enabled:
+        out = await _buffer_attempts(session_id, [payload])
+        if out is not None:
+            return out
+    return await run_db(_submit_attempt, session_id, payload)
+
+
+def _submit_attempts(db: Session, session_id: int, payload: list[schemas.AttemptIn]):
+    """Пачка ответов за раунд: одна транзакция, один executemany-INSERT."""
+    return _record_attempts(db, session_id, payload)
+
+
+@app.post("/api/sessions/{session_id}/attempts")
+async def submit_attempts(session_id: int, payload: list[schemas.AttemptIn]):
+    if len(payload) > ATTEMPTS_MAX_BATCH:
+        raise HTTPException(413, f"At most {ATTEMPTS_MAX_BATCH} attempts per request")
+    if attempt_buffer.enabled:
+        out = await _buffer_attempts(session_id, payload)
+        if out is not None:
+            out["inserted"] = len(payload)
+            return out
+    return await run_db(_submit_attempts, session_id, payload)
+
+
+def _finish_session(
+    db: Session, session_id: int, finished_at: Optional[datetime] = None, start_next: bool = False,
+):
+    session = _active_session(db, session_id)
+
+    # сначала закрыть (блокировка строки сессии), потом читать итоги: ответ,
+    # закоммиченный между чтением и закрытием, иначе не попал бы никуда
+    closed = _close_session(db, session, finished_at=finished_at)
+    attempts = db.scalars(queries.session_attempts(session.id)).all()
+
     total = len(attempts)
     correct = sum(1 for a in attempts if a.correct)
     wrong = total - correct
+    reaction_sum = sum(a.reaction_ms for a in attempts)
 
     accuracy = (correct / total) if total else 0.0
     avg_reaction_ms = (
-        sum(a.reaction_ms for a in attempts) / total
+        reaction_sum / total
         if total else 0.0
     )
 
@@ -253,199 +634,333 @@ def finish_session(session_id: int, db: Session = Depends(get_db)):
     elif accuracy < 0.6:
         next_exposure = min(2000, session.exposure_ms + 100)
 
-    # Закрываем только если ещё не закрыта
-    if session.finished_at is None:
-        session.finished_at = datetime.utcnow()
-        session.exposure_ms = next_exposure
-        db.commit()
+    if closed:
+        S = models.Session
+        db.execute(update(S).where(S.id == session.id).values(exposure_ms=next_exposure))
+        stats.record_session(db, session, total, correct, reaction_sum)
     # ================= ACHIEVEMENTS =================
-
-    new_achievements = []
-
-    # считаем максимум серии
-    max_streak = 0
-    cur = 0
-    for a in attempts:
-        if a.correct:
-            cur += 1
-            max_streak = max(max_streak, cur)
-        else:
-            cur = 0
-
-    # всего завершённых игр
-    total_sessions = (
-        db.query(models.Session)
-        .filter(
-            models.Session.child_id == session.child_id,
-            models.Session.finished_at.isnot(None),
-        )
-        .count()
+    # итоги читаются из rollup — он уже включает эту игру (та же транзакция)
+
+    lifetime_sessions, lifetime_attempts = achievements.lifetime_totals(db, session.child_id)
+    facts = achievements.SessionFacts(
+        attempts=total,
+        correct=correct,
+        reaction_ms_sum=reaction_sum,
+        max_streak=achievements.max_streak(a.correct for a in attempts),
+        lifetime_sessions=lifetime_sessions,
+        lifetime_attempts=lifetime_attempts,
     )
+    new_achievements = achievements.evaluate(db, session.child_id, facts)
+
+    next_session = None
+    if start_next and closed:
+        # следующая игра в той же транзакции; экспозиция — только что
+        # посчитанная, без повторного поиска последней завершённой игры.
+        # Повторный финиш (HTTP-переотправка финиша, уже принятого по WS)
+        # следующую игру не создаёт: клиент начнёт её обычным /start
+        theme_id = db.get(models.Session, session.id).theme_id
+        next_session, next_items = _new_session(
+            db, session.child_id, session.mode, session.difficulty, theme_id,
+            _clamp_exposure(session.difficulty, next_exposure),
+        )
 
-    # всего слов (по attempts)
-    total_attempts = (
-        db.query(models.Attempt)
-        .join(models.Session)
-        .filter(models.Session.child_id == session.child_id)
-        .count()
+    db.commit()
+    active_sessions.evict(session.id)
+    if next_session is not None:
+        db.refresh(next_session)
+        active_sessions.put(ActiveSession.from_row(next_session))
+    if closed:
+        metrics.sessions_finished.inc(session.mode)
+    for a in new_achievements:
+        metrics.achievements_unlocked.inc(a.code)
+    return schemas.SessionFinishOut(
+        session_id=session.id,
+        accuracy=accuracy,
+        avg_reaction_ms=avg_reaction_ms,
+        next_exposure_ms=int(next_exposure),
+        new_achievements=new_achievements,
+        next_session=_session_start_out(next_session, next_items) if next_session is not None else None,
     )
 
-    def unlock(code: str):
-        ach = db.execute(
-            select(models.Achievement).where(models.Achievement.code == code)
-        ).scalar_one_or_none()
-        if not ach:
-            return
-
-        exists = db.execute(
-            select(models.ChildAchievement)
-            .where(
-                models.ChildAchievement.child_id == session.child_id,
-                models.ChildAchievement.achievement_id == ach.id,
-            )
-        ).scalar_one_or_none()
-
-        if exists:
-            return
-
-        db.add(models.ChildAchievement(
-            child_id=session.child_id,
-            achievement_id=ach.id
-        ))
 
-        new_achievements.append(
-            schemas.AchievementOut(
-                code=ach.code,
-                title=ach.title,
-                description=ach.description,
-                icon=ach.icon
-            )
+@app.post("/api/sessions/{session_id}/finish", response_model=schemas.SessionFinishOut)
+async def finish_session(session_id: int, start_next: bool = Query(False, alias="next")):
+    """?next=1 — заодно начать следующую игру (next_session): один запрос между раундами вместо двух.
+    Только если этот запрос и закрыл сессию; на повторный финиш next_session = null."""
+    if attempt_buffer.enabled:
+        # accuracy считается по attempts — сначала дописать отложенные ответы
+        await run_in_threadpool(attempt_buffer.flush)
+    return await run_db(_finish_session, session_id, None, start_next)
+
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # в БД время — наивное UTC, как datetime.utcnow()
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _upload_session(db: Session, payload: schemas.SessionUploadIn) -> schemas.SessionUploadOut:
+    """Одна офлайн-игра: найти или создать сессию, дописать новые ответы, один раз финишировать."""
+    S = models.Session
+    finished_at = _utc(payload.finished_at)
+
+    if payload.session_id is not None:
+        session = db.get(S, payload.session_id)
+        if session is None or session.child_id != payload.child_id:
+            raise HTTPException(404, "Session not found")
+    else:
+        session = db.scalars(queries.session_by_client_id(payload.client_id)).first()
+
+    status = "updated"
+    if session is None:
+        if not db.get(models.Child, payload.child_id):
+            raise HTTPException(404, "Child not found")
+        exposure_ms = (
+            _clamp_exposure(payload.difficulty, payload.exposure_ms)
+            if payload.exposure_ms is not None
+            else _start_exposure(db, payload.child_id, payload.mode, payload.difficulty)
+        )
+        session = S(
+            child_id=payload.child_id,
+            mode=payload.mode,
+            difficulty=payload.difficulty,
+            theme_id=payload.theme_id or DEFAULT_THEME_ID,
+            started_at=_utc(payload.started_at) or finished_at or datetime.utcnow(),
+            exposure_ms=exposure_ms,
+            items_total=START_PRESETS[payload.difficulty]["items"],
+            lives_left=SURVIVAL_LIVES.get(payload.difficulty, 3) if payload.mode == "survival" else None,
+            client_id=payload.client_id,
         )
+        db.add(session)
+        # без коммита: сессия и её ответы появятся одной транзакцией
+        db.flush()
+        status = "created"
+    elif session.client_id is None:
+        session.client_id = payload.client_id
+
+    session_id = session.id
+    was_finished = session.finished_at is not None
+    inserted = _record_attempts(db, session_id, list(payload.attempts), finished_at)["inserted"]
+
+    finish = None
+    if was_finished:
+        # игра уже закрыта (прошлая выгрузка или онлайн-финиш) — итоги не пересчитываем
+        if not inserted:
+            status = "duplicate"
+    elif finished_at is not None:
+        finish = _finish_session(db, session_id, finished_at)
+
+    return schemas.SessionUploadOut(
+        client_id=payload.client_id,
+        session_id=session_id,
+        status=status,
+        inserted=inserted,
+        duplicates=len(payload.attempts) - inserted,
+        finish=finish,
+    )
 
-    # Условия
-    if max_streak >= 5:
-        unlock("streak_5")
 
-    if accuracy >= 1.0:
-        unlock("perfect_game")
+@app.post("/api/sessions/upload", response_model=list[schemas.SessionUploadOut])
+async def upload_sessions(payload: list[schemas.SessionUploadIn]):
+    """Очередь игр, накопленных без сети. Повторная выгрузка безопасна: сессии
+    находятся по client_id, ответы с уже записанным client_id пропускаются,
+    финиш (экспозиция, достижения) выполняется один раз. Каждая игра — своя
+    транзакция: ошибка в одной не мешает остальным."""
+    if len(payload) > UPLOAD_MAX_SESSIONS:
+        raise HTTPException(413, f"At most {UPLOAD_MAX_SESSIONS} sessions per request")
+    if any(len(g.attempts) > ATTEMPTS_MAX_BATCH for g in payload):
+        raise HTTPException(413, f"At most {ATTEMPTS_MAX_BATCH} attempts per session")
+    if attempt_buffer.enabled:
+        # ответы, отправленные онлайн, могут ещё лежать в буфере — дедупликация их не увидит
+        await run_in_threadpool(attempt_buffer.flush)
+
+    results = []
+    for item in payload:
+        try:
+            results.append(await run_db(_upload_session, item))
+        except (HTTPException, IntegrityError) as e:
+            detail = e.detail if isinstance(e, HTTPException) else "Conflicting upload, retry later"
+            results.append(schemas.SessionUploadOut(
+                client_id=item.client_id, session_id=item.session_id, status="error", error=str(detail),
+            ))
+    return results
 
-    if avg_reaction_ms < 2000 and total > 0:
-        unlock("fast_2000")
 
-    if total_sessions >= 10:
-        unlock("games_10")
+async def _save_attempts(session_id: int, payload: list[schemas.AttemptIn]) -> dict:
+    # WS-канал отвечает только после коммита — ждём пачку в любом режиме буфера
+    if attempt_buffer.enabled:
+        out = await _buffer_attempts(session_id, payload, wait=True)
+        if out is not None:
+            return out
+    return await run_db(_record_attempts, session_id, payload)
 
-    if total_attempts >= 100:
-        unlock("words_100")
 
-    if new_achievements:
-        db.commit()
-    return schemas.SessionFinishOut(
-        session_id=session.id,
-        accuracy=accuracy,
-        avg_reaction_ms=avg_reaction_ms,
-        next_exposure_ms=int(next_exposure),
-        new_achievements=new_achievements
-    )
+class _Channel:
+    """Одна игра по WebSocket. Ответ клиенту на ответ ребёнка — только после
+    коммита; на что ответа не пришло, клиент переотправит по HTTP."""
 
-def _calc_child_stats_by_mode(child: models.Child, db: Session) -> schemas.ChildStatsByModeOut:
-    # берем только завершённые сессии
-    sessions = (
-        db.query(models.Session)
-        .filter(
-            models.Session.child_id == child.id,
-            models.Session.finished_at.isnot(None),
-        )
-        .all()
-    )
+    def __init__(self, ws: WebSocket, state: ActiveSession):
+        self.ws = ws
+        self.state = state
+        self.pending: list[tuple[object, schemas.AttemptIn]] = []   # (seq, ответ)
+        self.deadline: Optional[float] = None
 
-    by_mode: dict[str, list[models.Session]] = {}
-    for s in sessions:
-        by_mode.setdefault(s.mode, []).append(s)
+    async def send(self, type_: str, seq, payload: dict) -> None:
+        await self.ws.send_json({"type": type_, "seq": seq, **payload})
 
-    modes_out: list[schemas.ModeStatsOut] = []
+    async def error(self, seq, status: int, detail) -> None:
+        await self.send("error", seq, {"status": status, "detail": detail})
 
-    for mode, mode_sessions in by_mode.items():
-        session_ids = [s.id for s in mode_sessions]
+    async def flush(self) -> None:
+        batch, self.pending, self.deadline = self.pending, [], None
+        if not batch:
+            return
+        try:
+            await _save_attempts(self.state.id, [a for _, a in batch])
+        except HTTPException as e:
+            for seq, _ in batch:
+                await self.error(seq, e.status_code, e.detail)
+            return
+        for seq, _ in batch:
+            await self.send("attempt", seq, {"ok": True})
+
+    async def on_attempt(self, seq, msg: dict) -> None:
+        attempt = schemas.AttemptIn.model_validate(msg)
+        if self.state.mode == "survival":
+            # жизни нужны клиенту до следующего слова — пишем сразу
+            await self.flush()
+            await self.send("attempt", seq, await run_db(_record_attempts, self.state.id, [attempt]))
+            return
+        self.pending.append((seq, attempt))
+        if len(self.pending) >= WS_FLUSH_ROWS:
+            await self.flush()
+        elif self.deadline is None:
+            self.deadline = asyncio.get_running_loop().time() + WS_FLUSH_MS / 1000
+
+    async def on_finish(self, seq, start_next: bool = False) -> None:
+        await self.flush()
+        if attempt_buffer.enabled:
+            await run_in_threadpool(attempt_buffer.flush)
+        out = await run_db(_finish_session, self.state.id, None, start_next)
+        await self.send("finish", seq, out.model_dump(mode="json"))
+
+    async def receive(self) -> Optional[str]:
+        """Следующее сообщение; None — пора сбросить накопленное."""
+        if self.deadline is None:
+            return await self.ws.receive_text()
+        timeout = self.deadline - asyncio.get_running_loop().time()
+        if timeout <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(self.ws.receive_text(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+@app.websocket("/ws/sessions/{session_id}")
+async def session_channel(websocket: WebSocket, session_id: int):
+    """Ответы и финиш одной игры по одному соединению.
+
+    Клиент шлёт {"type": "attempt", "seq": n, ...AttemptIn} и {"type": "finish", "seq": n}
+    ("next": true — как finish?next=1);
+    сервер отвечает с тем же seq: "attempt" (в survival — lives_left/finished),
+    "finish" (SessionFinishOut) или "error" (status/detail как в HTTP). После
+    финиша соединение закрывается.
+    """
+    await websocket.accept()
+    try:
+        state = await run_db(_active_session, session_id)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code, reason=str(e.detail))
+        return
+
+    ch = _Channel(websocket, state)
+    try:
+        while True:
+            text = await ch.receive()
+            if text is None:
+                await ch.flush()
+                continue
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                await ch.error(None, 400, "Invalid JSON")
+                continue
+            if not isinstance(msg, dict):
+                await ch.error(None, 400, "Expected a JSON object")
+                continue
+            seq = msg.get("seq")
+            try:
+                if msg.get("type") == "attempt":
+                    await ch.on_attempt(seq, msg)
+                elif msg.get("type") == "finish":
+                    await ch.on_finish(seq, bool(msg.get("next")))
+                    await websocket.close()
+                    return
+                else:
+                    await ch.error(seq, 400, "Unknown message type")
+            except ValidationError as e:
+                await ch.error(seq, 422, e.errors(include_url=False, include_context=False))
+            except HTTPException as e:
+                await ch.error(seq, e.status_code, e.detail)
+    except WebSocketDisconnect:
+        # неподтверждённые ответы не пишем: клиент переотправит их по HTTP
+        pass
+
+
+# стабильный порядок режимов в статистике
+MODE_ORDER = {
+    "word_flash": 0,
+    "survival": 1,
+    "odd_one_out": 2,
+    "letter_builder": 3,
+    "vocab_spell": 4,
+}
 
-        attempts = (
-            db.query(models.Attempt)
-            .filter(models.Attempt.session_id.in_(session_ids))
-            .all()
-        )
 
-        attempts_n = len(attempts)
-        correct_n = sum(1 for a in attempts if a.correct)
-        reaction_sum = sum(a.reaction_ms for a in attempts)
+def _calc_children_stats_by_mode(children, db: Session) -> list[schemas.ChildStatsByModeOut]:
+    """children — [(id, name)] страницы по возрастанию id. Один GROUP BY по rollup на всю страницу."""
+    out = [
+        schemas.ChildStatsByModeOut(child_id=child_id, child_name=child_name, total_sessions=0, modes=[])
+        for child_id, child_name in children
+    ]
+    by_id = {cur.child_id: cur for cur in out}
+    rows = db.execute(queries.children_mode_totals(list(by_id))).all() if by_id else []
+
+    # у ребёнка без завершённых сессий строк в rollup нет — modes остаётся пустым
+    for child_id, mode, sessions_n, attempts_n, correct_n, reaction_sum in rows:
+        cur = by_id[child_id]
+        cur.total_sessions += sessions_n
 
         avg_accuracy = (correct_n / attempts_n) if attempts_n else 0.0
         avg_reaction_ms = (reaction_sum / attempts_n) if attempts_n else 0.0
 
-        modes_out.append(
+        cur.modes.append(
             schemas.ModeStatsOut(
                 mode=mode,  # type: ignore[arg-type]
-                sessions=len(mode_sessions),
+                sessions=sessions_n,
                 attempts=attempts_n,
                 avg_accuracy=avg_accuracy,
                 avg_reaction_ms=avg_reaction_ms,
             )
         )
 
-    # стабильный порядок
-    order = {
-        "word_flash": 0,
-        "survival": 1,
-        "odd_one_out": 2,
-        "letter_builder": 3,
-        "vocab_spell": 4,
-    }
-    modes_out.sort(key=lambda x: order.get(x.mode, 99))
+    for cur in out:
+        cur.modes.sort(key=lambda x: MODE_ORDER.get(x.mode, 99))
+    return out
 
-    return schemas.ChildStatsByModeOut(
-        child_id=child.id,
-        child_name=child.name,
-        total_sessions=len(sessions),
-        modes=modes_out,
-    )
 
-@app.get("/api/stats/summary/{child_id}", response_model=schemas.ChildStatsOut)
-def get_stats(child_id: int, db: Session = Depends(get_db)):
+def _calc_child_stats_by_mode(child: models.Child, db: Session) -> schemas.ChildStatsByModeOut:
+    # читаем rollup (только завершённые сессии), а не сырые attempts
+    return _calc_children_stats_by_mode([(child.id, child.name)], db)[0]
+
+def _get_stats(db: Session, child_id: int):
     child = db.get(models.Child, child_id)
     if not child:
         raise HTTPException(404, "Child not found")
 
-    sessions = (
-        db.query(models.Session)
-        .filter(
-            models.Session.child_id == child_id,
-            models.Session.finished_at.isnot(None),
-        )
-        .all()
-    )
-
-    total_sessions = len(sessions)
-    if total_sessions == 0:
-        return schemas.ChildStatsOut(
-            child_id=child_id,
-            total_sessions=0,
-            avg_accuracy=0.0,
-            avg_reaction_ms=0.0,
-        )
-
-    total_attempts = 0
-    total_correct = 0
-    total_reaction = 0
-
-    for s in sessions:
-        attempts = (
-            db.query(models.Attempt)
-            .filter(models.Attempt.session_id == s.id)
-            .all()
-        )
-
-        total_attempts += len(attempts)
-        total_correct += sum(1 for a in attempts if a.correct)
-        total_reaction += sum(a.reaction_ms for a in attempts)
+    total_sessions, total_attempts, total_correct, total_reaction = db.execute(queries.child_totals(child_id)).one()
 
     avg_accuracy = (total_correct / total_attempts) if total_attempts else 0.0
     avg_reaction_ms = (total_reaction / total_attempts) if total_attempts else 0.0
@@ -457,51 +972,89 @@ def get_stats(child_id: int, db: Session = Depends(get_db)):
         avg_reaction_ms=avg_reaction_ms,
     )
 
-@app.get("/api/stats/children/{child_id}", response_model=schemas.ChildStatsByModeOut)
-def get_child_stats_by_mode(child_id: int, db: Session = Depends(get_db)):
+
+@app.get("/api/stats/summary/{child_id}", response_model=schemas.ChildStatsOut)
+async def get_stats(child_id: int):
+    return await run_db(_get_stats, child_id)
+
+
+def _get_child_stats_by_mode(db: Session, child_id: int):
     child = db.get(models.Child, child_id)
     if not child:
         raise HTTPException(404, "Child not found")
 
     return _calc_child_stats_by_mode(child, db)
 
-@app.get("/api/stats/children", response_model=schemas.AllChildrenStatsOut)
-def get_all_children_stats(db: Session = Depends(get_db)):
-    children = db.query(models.Child).order_by(models.Child.id.asc()).all()
 
-    out = [
-        _calc_child_stats_by_mode(c, db)
-        for c in children
-    ]
+@app.get("/api/stats/children/{child_id}", response_model=schemas.ChildStatsByModeOut)
+async def get_child_stats_by_mode(child_id: int):
+    return await run_db(_get_child_stats_by_mode, child_id)
+
+
+def _get_all_children_stats(db: Session, limit: Optional[int], after_id: Optional[int]):
+    # keyset-пагинация по children.id: ?limit=100&after_id=<next_after_id>
+    page = db.execute(queries.children_page(after_id, limit)).all()
+    out = _calc_children_stats_by_mode(page, db)
+
+    # COUNT по всей таблице — только на первой странице, дальше клиент его уже знает
+    total_children = db.query(func.count(models.Child.id)).scalar() if after_id is None else None
+    next_after_id = None
+    if limit is not None and len(out) == limit:
+        next_after_id = out[-1].child_id
 
     return schemas.AllChildrenStatsOut(
-        total_children=len(children),
+        total_children=total_children,
         children=out,
+        next_after_id=next_after_id,
     )
-@app.get("/api/children/{child_id}/achievements")
-def get_child_achievements(child_id: int, db: Session = Depends(get_db)):
+
+
+@app.get("/api/stats/children", response_model=schemas.AllChildrenStatsOut)
+async def get_all_children_stats(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+):
+    return await run_db(_get_all_children_stats, limit, after_id)
+
+
+def _render_achievements(rows):
+    # по два готовых JSON-фрагмента на достижение: закрытое / открытое
+    parts = []
+    for ach_id, a in rows:
+        item = a.model_dump()
+        parts.append((
+            ach_id,
+            http_cache.dumps({**item, "unlocked": False}),
+            http_cache.dumps({**item, "unlocked": True}),
+        ))
+    return http_cache.make_etag(*(p[1] for p in parts)), parts
+
+
+_achievements_catalog = http_cache.SnapshotCache(_render_achievements)
+
+
+def _get_child_achievements(db: Session, child_id: int, if_none_match: Optional[str] = None):
     child = db.get(models.Child, child_id)
     if not child:
         raise HTTPException(404, "Child not found")
 
-    # все достижения
-    all_achs = db.query(models.Achievement).order_by(models.Achievement.id.asc()).all()
+    catalog_etag, parts = _achievements_catalog.get(achievements.catalog(db))
+    unlocked = achievements.unlocked_ids(db, child_id)
 
-    # какие открыты у ребёнка
-    unlocked_rows = (
-        db.query(models.ChildAchievement.achievement_id)
-        .filter(models.ChildAchievement.child_id == child_id)
-        .all()
+    # тело однозначно задаётся каталогом и набором открытых — из них и ETag
+    etag = http_cache.make_etag(
+        catalog_etag.encode(),
+        ",".join(str(i) for i in sorted(unlocked)).encode(),
     )
-    unlocked_ids = {x[0] for x in unlocked_rows}
+    # открытые достижения меняются после каждой игры — всегда перепроверять
+    cache_control = "private, no-cache"
+    if http_cache.etag_matches(if_none_match, etag):
+        return http_cache.not_modified(etag, cache_control)
 
-    return [
-        {
-            "code": a.code,
-            "title": a.title,
-            "description": a.description,
-            "icon": a.icon,
-            "unlocked": (a.id in unlocked_ids),
-        }
-        for a in all_achs
-    ]
\ No newline at end of file
+    body = b"[" + b",".join(on if ach_id in unlocked else off for ach_id, off, on in parts) + b"]"
+    return http_cache.respond(None, http_cache.Body(body, etag), cache_control)
+
+
+@app.get("/api/children/{child_id}/achievements")
+async def get_child_achievements(child_id: int, if_none_match: Optional[str] = Header(None)):
+    return await run_db(_get_child_achievements, child_id, if_none_match)
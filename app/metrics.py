@@ -0,0 +1,267 @@
+"""Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+Без внешних зависимостей: счётчики, gauge и гистограммы с метками, которые
+рендерятся в exposition format 0.0.4. Что собирается:
+
+  * HTTP — латентность по шаблону маршрута, запросы в работе, статусы;
+  * SQL — число и время запросов, в целом и на один HTTP-запрос (события
+    движка из db.py + contextvar, который живёт ровно один запрос);
+  * пул соединений — выдачи, ожидание соединения, занятые соединения;
+  * генерация колод по режимам, survival и достижения.
+
+С несколькими воркерами uvicorn у каждого процесса свои числа — Prometheus
+различает их по instance/pid, сумма считается на его стороне.
+"""
+import contextvars
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+# секунды; от быстрого SELECT до тяжёлого финиша
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [n + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Значение задаётся напрямую или считается при каждом рендере (collect)."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collect: Optional[Callable[[], dict]] = None):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list[str]:
+        if self._collect is not None:
+            values = self._collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [counts по бакетам..., sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = []
+        for k, row in items:
+            acc = 0
+            for b, n in zip(self.buckets, row):
+                acc += n
+                le = 'le="' + _fmt(b) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {acc}")
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {row[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, k)} {_fmt(row[-2])}")
+            out.append(f"{self.name}_count{_labels(self.label_names, k)} {row[-1]}")
+        return out
+
+
+REGISTRY: list[_Metric] = []
+
+
+def _reg(m):
+    REGISTRY.append(m)
+    return m
+
+
+def render() -> str:
+    lines: list[str] = []
+    for m in REGISTRY:
+        lines += m.header()
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---- метрики приложения ----
+
+http_requests = _reg(Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_latency = _reg(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_in_flight = _reg(Gauge("http_requests_in_flight", "HTTP requests being served"))
+http_db_statements = _reg(Histogram(
+    "http_request_db_statements", "SQL statements per HTTP request", ("route",), buckets=COUNT_BUCKETS,
+))
+http_db_seconds = _reg(Histogram("http_request_db_seconds", "SQL time per HTTP request", ("route",)))
+
+db_statements = _reg(Counter("db_statements_total", "SQL statements executed"))
+db_latency = _reg(Histogram("db_statement_duration_seconds", "SQL statement latency"))
+db_pool_checkouts = _reg(Counter("db_pool_checkouts_total", "Connections checked out of the pool"))
+db_pool_wait = _reg(Histogram(
+    "db_pool_wait_seconds", "Time to get a connection for a request (queueing + new connects)",
+))
+_pools: list = []
+db_pool_checked_out = _reg(Gauge(
+    "db_pool_checked_out", "Connections currently checked out",
+    collect=lambda: {(): sum(p.checkedout() for p in _pools)},
+))
+
+generation_latency = _reg(Histogram("content_generation_seconds", "Deck generation time", ("mode",)))
+sessions_finished = _reg(Counter("sessions_finished_total", "Sessions closed", ("mode",)))
+survival_lives_lost = _reg(Counter("survival_lives_lost_total", "Wrong answers in survival games"))
+survival_deaths = _reg(Counter("survival_deaths_total", "Survival games ended by running out of lives"))
+achievements_unlocked = _reg(Counter("achievements_unlocked_total", "Achievements unlocked", ("code",)))
+
+
+# ---- SQL на один запрос ----
+
+# [statements, seconds] текущего HTTP-запроса; список — чтобы потоки пула,
+# получившие копию контекста, дописывали в тот же объект
+_request_db: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("rg_request_db", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Повесить счётчики SQL и пула на синхронный Engine (для async — engine.sync_engine)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("rg_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("rg_t0")
+        if not starts:
+            return
+        dt = time.perf_counter() - starts.pop()
+        db_statements.inc()
+        db_latency.observe(dt)
+        acc = _request_db.get()
+        if acc is not None:
+            acc[0] += 1
+            acc[1] += dt
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        conn = ctx.connection
+        if conn is not None and conn.info.get("rg_t0"):
+            conn.info["rg_t0"].pop()
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        db_pool_checkouts.inc()
+
+    if hasattr(engine.pool, "checkedout"):
+        _pools.append(engine.pool)
+
+
+# ---- ASGI middleware ----
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        acc = [0, 0.0]
+        token = _request_db.set(acc)
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            http_in_flight.dec()
+            _request_db.reset(token)
+            # шаблон маршрута (FastAPI кладёт route в scope), а не сырой путь —
+            # иначе каждый session_id стал бы своей серией
+            route = scope.get("route")
+            if route is not None:
+                label = route.path
+            elif scope["path"].startswith("/static/"):
+                label = "/static"
+            else:
+                label = "<unmatched>"
+            method = scope["method"]
+            http_requests.inc(method, label, str(status[0]))
+            http_latency.observe(dt, method, label)
+            http_db_statements.observe(acc[0], label)
+            http_db_seconds.observe(acc[1], label)
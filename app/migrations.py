@@ -0,0 +1,211 @@
+"""Версионированные миграции схемы.
+
+В БД хранится номер версии (таблица schema_version). На старте
+`upgrade(engine)` создаёт недостающие таблицы и по порядку применяет шаги
+с номером больше текущего. Шаги идемпотентны: на свежей БД create_all уже
+создал всё по моделям, и шаг просто ничего не меняет.
+
+Новый шаг — функция (db: Session) -> None, добавленная в конец MIGRATIONS.
+
+    python -m app.migrations            # применить миграции
+    python -m app.migrations check      # EXPLAIN QUERY PLAN горячих запросов (SQLite)
+"""
+import sys
+from typing import Callable
+
+from sqlalchemy import Column, Integer, Table, case, select, func, update, insert, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .db import Base
+from . import models, queries, stats
+
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+def _create_index(db: Session, table: Table, name: str) -> None:
+    idx = next(i for i in table.indexes if i.name == name)
+    idx.create(db.connection(), checkfirst=True)
+
+
+def _add_column(db: Session, table: Table, name: str) -> None:
+    conn = db.connection()
+    if name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+        return
+    col = table.c[name]
+    ddl = f"{col.type.compile(dialect=conn.dialect)}"
+    if not col.nullable:
+        if col.server_default is None:
+            raise ValueError(f"{table.name}.{name}: NOT NULL columns need a server_default in the migration")
+        ddl += f" NOT NULL DEFAULT {col.server_default.arg}"
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {name} {ddl}")
+
+
+def _m001_attempts_session_index(db: Session) -> None:
+    # индекс заменён шагом 7 (ix_attempts_session_id)
+    pass
+
+
+def _m002_sessions_child_index(db: Session) -> None:
+    # индекс заменён шагом 7 (ix_sessions_child_mode_diff_id_finished)
+    pass
+
+
+def _m003_backfill_child_mode_stats(db: Session) -> None:
+    # rollup появился после первых игр — заполняем его из истории
+    stats.rebuild(db)
+
+
+def _m004_session_seed_columns(db: Session) -> None:
+    _add_column(db, models.Session.__table__, "rng_seed")
+    _add_column(db, models.Session.__table__, "content_version")
+
+
+def _m005_session_lives_columns(db: Session) -> None:
+    S = models.Session.__table__
+    A = models.Attempt.__table__
+    _add_column(db, S, "wrong_count")
+    _add_column(db, S, "lives_left")
+
+    wrong = (
+        select(func.count())
+        .select_from(A)
+        .where(A.c.session_id == S.c.id, A.c.correct == 0)
+        .scalar_subquery()
+    )
+    # счётчик ведётся только в survival — как и в рабочем коде
+    db.execute(update(S).where(S.c.mode == "survival").values(wrong_count=wrong))
+
+    # запас жизней по уровням на момент миграции (main.SURVIVAL_LIVES)
+    lives_start = case({"easy": 4, "normal": 3, "hard": 2}, value=S.c.difficulty, else_=3)
+    left = lives_start - S.c.wrong_count
+    db.execute(
+        update(S)
+        .where(S.c.mode == "survival")
+        .values(lives_left=case((left < 0, 0), else_=left))
+    )
+
+
+def _m006_client_ids(db: Session) -> None:
+    _add_column(db, models.Session.__table__, "client_id")
+    _add_column(db, models.Attempt.__table__, "client_id")
+    _create_index(db, models.Session.__table__, "ux_sessions_client_id")
+    _create_index(db, models.Attempt.__table__, "ux_attempts_client_id")
+
+
+def _m007_order_by_id_indexes(db: Session) -> None:
+    # старые индексы давали USE TEMP B-TREE FOR ORDER BY на старте и финише
+    conn = db.connection()
+    for name in ("ix_attempts_session_correct", "ix_sessions_child_mode_diff_finished"):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    _create_index(db, models.Attempt.__table__, "ix_attempts_session_id")
+    _create_index(db, models.Session.__table__, "ix_sessions_child_mode_diff_id_finished")
+
+
+def _m008_wrong_count_survival_only(db: Session) -> None:
+    # шаг 5 в первой версии заполнил wrong_count во всех режимах
+    S = models.Session.__table__
+    db.execute(update(S).where(S.c.mode != "survival", S.c.wrong_count != 0).values(wrong_count=0))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Session], None]]] = [
+    (1, "index attempts(session_id, correct)", _m001_attempts_session_index),
+    (2, "index sessions(child_id, mode, difficulty, finished_at, id)", _m002_sessions_child_index),
+    (3, "backfill child_mode_stats", _m003_backfill_child_mode_stats),
+    (4, "sessions.rng_seed, sessions.content_version", _m004_session_seed_columns),
+    (5, "sessions.wrong_count, sessions.lives_left (backfill)", _m005_session_lives_columns),
+    (6, "sessions.client_id, attempts.client_id (unique)", _m006_client_ids),
+    (7, "index attempts(session_id, id), sessions(child_id, mode, difficulty, id) where finished", _m007_order_by_id_indexes),
+    (8, "sessions.wrong_count: survival only", _m008_wrong_count_survival_only),
+]
+
+
+def current_version(db: Session) -> int:
+    return db.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar_one()
+
+
+def upgrade(engine: Engine) -> int:
+    """Создать таблицы и применить недостающие шаги. Возвращает итоговую версию."""
+    Base.metadata.create_all(bind=engine)
+
+    with Session(bind=engine) as db:
+        version = current_version(db)
+        if db.execute(select(func.count()).select_from(schema_version)).scalar_one() == 0:
+            db.execute(insert(schema_version).values(version=0))
+            db.commit()
+
+        for step_version, _name, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            step(db)
+            db.execute(update(schema_version).values(version=step_version))
+            db.commit()
+            version = step_version
+
+    return version
+
+
+# ---- проверка планов горячих запросов ----
+# Запросы собираются теми же построителями (app/queries.py), что вызывает
+# рабочий код на каждом ответе / старте / финише; аргументы — любые.
+
+def hot_queries():
+    return {
+        "start_session: last finished session": queries.last_finished_session(1, "word_flash", "normal"),
+        "submit_attempt: survival lives update": queries.survival_lives_update(1, 1, 3),
+        "submit_attempt: closed sessions of the batch": queries.closed_sessions([1, 2]),
+        "upload_sessions: session by client id": queries.session_by_client_id("a"),
+        "finish_session: session attempts": queries.session_attempts(1),
+        "finish_session: session totals": queries.session_totals(1),
+        "finish_session: lifetime totals": queries.lifetime_totals(1),
+        "finish_session: unlocked achievements": queries.unlocked_achievements(1),
+        "stats: child totals": queries.child_totals(1),
+        "stats: children page": queries.children_page(0, 100),
+        "stats: children mode totals": queries.children_mode_totals([1, 2]),
+    }
+
+
+def check_query_plans(engine: Engine) -> list[str]:
+    """Список ошибок: горячие запросы с полным SCAN таблицы или сортировкой во временном B-дереве."""
+    problems: list[str] = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+            for row in plan:
+                detail = row[-1]
+                if detail.startswith("SCAN") or "USE TEMP B-TREE" in detail:
+                    problems.append(f"{name}: {detail}")
+    return problems
+
+
+def main(argv: list[str]) -> int:
+    from .db import engine
+
+    if argv[1:] == []:
+        print(f"schema version: {upgrade(engine)}")
+        return 0
+
+    if argv[1:] == ["check"]:
+        if engine.dialect.name != "sqlite":
+            print("check: EXPLAIN QUERY PLAN is only checked on SQLite", file=sys.stderr)
+            return 2
+        upgrade(engine)
+        problems = check_query_plans(engine)
+        for p in problems:
+            print(f"BAD PLAN  {p}")
+        if problems:
+            return 1
+        print(f"ok: {len(hot_queries())} hot queries use indexes without temp b-trees")
+        return 0
+
+    print("usage: python -m app.migrations [check]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Text
+from sqlalchemy import String, Integer, BigInteger, DateTime, ForeignKey, Float, Text, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -25,9 +25,34 @@ class Session(Base):
     exposure_ms: Mapped[int] = mapped_column(Integer, default=1200, nullable=False)
     items_total: Mapped[int] = mapped_column(Integer, default=7, nullable=False)
 
+    # воспроизводимая колода: seed ГСЧ + версия контента на момент старта
+    rng_seed: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    content_version: Mapped[str | None] = mapped_column(String(32), nullable=True)
+
+    # счётчики ответа в survival: обновляются одним UPDATE ... RETURNING вместе
+    # с записью ответа, без COUNT(*) по attempts. lives_left — только у survival
+    wrong_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    lives_left: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # UUID игры, сыгранной офлайн (POST /api/sessions/upload) — по нему повторная
+    # выгрузка находит уже созданную сессию
+    client_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+
     child: Mapped["Child"] = relationship(back_populates="sessions")
     attempts: Mapped[list["Attempt"]] = relationship(back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # start_session: последняя завершённая сессия ребёнка в режиме/уровне.
+        # Частичный по finished_at — id сразу после равенств, ORDER BY id DESC
+        # LIMIT 1 берёт одну запись индекса без сортировки
+        Index(
+            "ix_sessions_child_mode_diff_id_finished", "child_id", "mode", "difficulty", "id",
+            sqlite_where=text("finished_at IS NOT NULL"),
+            postgresql_where=text("finished_at IS NOT NULL"),
+        ),
+        Index("ux_sessions_client_id", "client_id", unique=True),
+    )
+
 class Attempt(Base):
     __tablename__ = "attempts"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -37,9 +62,17 @@ class Attempt(Base):
     correct: Mapped[int] = mapped_column(Integer, nullable=False)     # 0/1
     reaction_ms: Mapped[int] = mapped_column(Integer, nullable=False) # время ответа
     shown_ms: Mapped[int] = mapped_column(Integer, nullable=False)    # сколько показывали стимул
+    client_id: Mapped[str | None] = mapped_column(String(36), nullable=True)  # UUID ответа с клиента — для дедупликации
 
     session: Mapped["Session"] = relationship(back_populates="attempts")
 
+    __table_args__ = (
+        # попытки сессии в порядке ответов (финиш считает серию) и агрегаты по сессии
+        Index("ix_attempts_session_id", "session_id", "id"),
+        # повторная отправка того же ответа (переподключение, офлайн-выгрузка)
+        Index("ux_attempts_client_id", "client_id", unique=True),
+    )
+
 # ================== ACHIEVEMENTS ==================
 
 class Achievement(Base):
@@ -68,4 +101,22 @@ class ChildAchievement(Base):
         DateTime,
         default=datetime.utcnow,
         nullable=False
-    )
\ No newline at end of file
+    )
+
+# ================== STATS ROLLUP ==================
+
+class ChildModeStats(Base):
+    """Накопленная статистика ребёнка по (mode, difficulty) — только завершённые сессии."""
+    __tablename__ = "child_mode_stats"
+
+    child_id: Mapped[int] = mapped_column(
+        ForeignKey("children.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    mode: Mapped[str] = mapped_column(String(32), primary_key=True)
+    difficulty: Mapped[str] = mapped_column(String(16), primary_key=True)
+
+    sessions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reaction_ms_sum: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
@@ -0,0 +1,116 @@
+"""SQL горячих путей: ответ, старт, финиш, статистика.
+
+Эти построители вызывает рабочий код (main.py, stats.py, achievements.py), и
+из них же `python -m app.migrations check` собирает запросы для EXPLAIN QUERY
+PLAN — проверяется ровно то, что выполняется.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.sql import Select, Update
+
+from . import models
+
+S = models.Session
+A = models.Attempt
+T = models.ChildModeStats
+
+
+def last_finished_session(child_id: int, mode: str, difficulty: str) -> Select:
+    """start_session: последняя завершённая игра ребёнка в режиме и уровне."""
+    return (
+        select(S)
+        .where(
+            S.child_id == child_id,
+            S.mode == mode,
+            S.difficulty == difficulty,
+            S.finished_at.isnot(None),
+        )
+        .order_by(S.id.desc())
+        .limit(1)
+    )
+
+
+def survival_lives_update(session_id: int, wrong: int, lives_start: int) -> Update:
+    """Минус жизни за пачку ответов; возвращает (wrong_count, lives_left, finished_at)."""
+    left = func.coalesce(S.lives_left, lives_start - S.wrong_count) - wrong
+    return (
+        update(S)
+        .where(S.id == session_id)
+        .values(wrong_count=S.wrong_count + wrong, lives_left=case((left < 0, 0), else_=left))
+        .returning(S.wrong_count, S.lives_left, S.finished_at)
+    )
+
+
+def closed_sessions(session_ids: Iterable[int]) -> Select:
+    # после INSERT ответов: FOR SHARE ждёт финиш, который уже закрывает сессию
+    return (
+        select(S)
+        .where(S.id.in_(set(session_ids)), S.finished_at.isnot(None))
+        .with_for_update(read=True)
+    )
+
+
+def session_by_client_id(client_id: str) -> Select:
+    return select(S).where(S.client_id == client_id).limit(1)
+
+
+def session_attempts(session_id: int) -> Select:
+    # серия считается в порядке ответов
+    return select(A).where(A.session_id == session_id).order_by(A.id)
+
+
+def session_totals(session_id: int) -> Select:
+    return select(
+        func.count(A.id),
+        func.coalesce(func.sum(A.correct), 0),
+        func.coalesce(func.sum(A.reaction_ms), 0),
+    ).where(A.session_id == session_id)
+
+
+def lifetime_totals(child_id: int) -> Select:
+    return select(
+        func.coalesce(func.sum(T.sessions), 0), func.coalesce(func.sum(T.attempts), 0),
+    ).where(T.child_id == child_id)
+
+
+def unlocked_achievements(child_id: int) -> Select:
+    return select(models.ChildAchievement.achievement_id).where(models.ChildAchievement.child_id == child_id)
+
+
+def child_totals(child_id: int) -> Select:
+    return select(
+        func.coalesce(func.sum(T.sessions), 0),
+        func.coalesce(func.sum(T.attempts), 0),
+        func.coalesce(func.sum(T.correct), 0),
+        func.coalesce(func.sum(T.reaction_ms_sum), 0),
+    ).where(T.child_id == child_id)
+
+
+def children_page(after_id: Optional[int], limit: Optional[int]) -> Select:
+    # keyset-пагинация по children.id
+    page = select(models.Child.id, models.Child.name)
+    if after_id is not None:
+        page = page.where(models.Child.id > after_id)
+    page = page.order_by(models.Child.id.asc())
+    if limit is not None:
+        page = page.limit(limit)
+    return page
+
+
+def children_mode_totals(child_ids: list[int]) -> Select:
+    """Rollup страницы детей по режимам. IN по ключу child_mode_stats — строки идут
+    в порядке первичного ключа, GROUP BY и ORDER BY без временного B-дерева."""
+    return (
+        select(
+            T.child_id,
+            T.mode,
+            func.sum(T.sessions),
+            func.sum(T.attempts),
+            func.sum(T.correct),
+            func.sum(T.reaction_ms_sum),
+        )
+        .where(T.child_id.in_(child_ids))
+        .group_by(T.child_id, T.mode)
+        .order_by(T.child_id, T.mode)
+    )
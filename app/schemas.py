@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
 
@@ -41,6 +42,14 @@ class AttemptIn(BaseModel):
     correct: bool
     reaction_ms: int
     shown_ms: int
+    # UUID, сгенерированный клиентом: повторная отправка того же ответа не пишется дважды
+    client_id: Optional[str] = Field(None, min_length=1, max_length=36)
+
+class AchievementOut(BaseModel):
+    code: str
+    title: str
+    description: str
+    icon: str
 
 class SessionFinishOut(BaseModel):
     session_id: int
@@ -48,6 +57,33 @@ class SessionFinishOut(BaseModel):
     avg_reaction_ms: float
     next_exposure_ms: int
     new_achievements: list[AchievementOut] = []
+    # finish?next=1: следующая игра того же режима, темы и уровня — уже начата
+    next_session: Optional[SessionStartOut] = None
+
+class UploadAttemptIn(AttemptIn):
+    client_id: str = Field(min_length=1, max_length=36)
+
+class SessionUploadIn(BaseModel):
+    """Игра, сыгранная без сети, целиком: параметры старта, ответы, время финиша."""
+    client_id: str = Field(min_length=1, max_length=36)
+    session_id: Optional[int] = None     # если /start успел пройти до обрыва
+    child_id: int
+    mode: Mode = "word_flash"
+    difficulty: Difficulty = "normal"
+    theme_id: int = 1
+    exposure_ms: Optional[int] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: list[UploadAttemptIn] = []
+
+class SessionUploadOut(BaseModel):
+    client_id: str
+    session_id: Optional[int] = None
+    status: Literal["created", "updated", "duplicate", "error"]
+    inserted: int = 0
+    duplicates: int = 0
+    finish: Optional[SessionFinishOut] = None
+    error: Optional[str] = None
 
 class ChildStatsOut(BaseModel):
     child_id: int
@@ -69,11 +105,6 @@ class ChildStatsByModeOut(BaseModel):
     modes: list[ModeStatsOut]
 
 class AllChildrenStatsOut(BaseModel):
-    total_children: int
+    total_children: Optional[int] = None  # только на первой странице (без after_id)
     children: list[ChildStatsByModeOut]
-
-class AchievementOut(BaseModel):
-    code: str
-    title: str
-    description: str
-    icon: str
\ No newline at end of file
+    next_after_id: Optional[int] = None  # курсор следующей страницы (если задан limit)
@@ -0,0 +1,161 @@
+"""Кэш состояния активных сессий для горячего пути ответов и финиша.
+
+Игра длится пару минут, а каждый ответ начинался с чтения строки сессии.
+Здесь лежит то, что нужно на каждом ответе: ребёнок, режим, уровень,
+экспозиция и счётчики survival. Запись — только после коммита, на финише
+сессия вытесняется.
+
+Локальный кэш у каждого воркера свой, и финиш вытесняет сессию только в
+своём процессе. Поэтому решения по кэшу не принимаются: жизни survival
+читаются из строки сессии (UPDATE ... RETURNING), закрытие — условным
+UPDATE по finished_at IS NULL, а ответ в уже закрытую сессию попадает в
+rollup отдельно. Неизменные поля (ребёнок, режим, уровень) из кэша верны
+в любом воркере.
+
+Бэкенд выбирается окружением:
+    SESSION_CACHE_URL не задан   — LRU с TTL в памяти процесса (по умолчанию)
+    SESSION_CACHE_URL=redis://…  — общий Redis для нескольких воркеров
+                                   (pip install redis)
+    SESSION_CACHE_SIZE=0         — кэш выключен
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+SESSION_CACHE_URL = os.getenv("SESSION_CACHE_URL")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "1800"))
+
+
+@dataclass(frozen=True)
+class ActiveSession:
+    id: int
+    child_id: int
+    mode: str
+    difficulty: str
+    exposure_ms: int
+    wrong_count: int = 0
+    lives_left: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, s) -> "ActiveSession":
+        return cls(
+            id=s.id,
+            child_id=s.child_id,
+            mode=s.mode,
+            difficulty=s.difficulty,
+            exposure_ms=s.exposure_ms,
+            wrong_count=s.wrong_count,
+            lives_left=s.lives_left,
+        )
+
+
+class SessionCache:
+    """Интерфейс бэкенда: get / put / evict + счётчики попаданий."""
+
+    backend = "none"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: int) -> Optional[ActiveSession]:
+        self.misses += 1
+        return None
+
+    def put(self, state: ActiveSession) -> None:
+        pass
+
+    def evict(self, session_id: int) -> None:
+        pass
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def _count(self, state: Optional[ActiveSession]) -> Optional[ActiveSession]:
+        # счётчики без блокировки: метрика, а не учёт
+        if state is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return state
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class LocalSessionCache(SessionCache):
+    backend = "local"
+
+    def __init__(self, maxsize: int = SESSION_CACHE_SIZE, ttl: float = SESSION_CACHE_TTL):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[int, tuple[float, ActiveSession]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: int) -> Optional[ActiveSession]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(session_id)
+            if entry is not None and entry[0] < now:
+                del self._items[session_id]
+                entry = None
+            if entry is not None:
+                self._items.move_to_end(session_id)
+        return self._count(entry[1] if entry else None)
+
+    def put(self, state: ActiveSession) -> None:
+        with self._lock:
+            self._items[state.id] = (time.monotonic() + self.ttl, state)
+            self._items.move_to_end(state.id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def evict(self, session_id: int) -> None:
+        with self._lock:
+            self._items.pop(session_id, None)
+
+    def size(self) -> int:
+        return len(self._items)
+
+
+class RedisSessionCache(SessionCache):
+    backend = "redis"
+
+    def __init__(self, url: str, ttl: float = SESSION_CACHE_TTL, prefix: str = "rg:session:"):
+        import redis  # опциональная зависимость, нужна только этому бэкенду
+
+        super().__init__()
+        self._r = redis.Redis.from_url(url)
+        self.ttl = max(1, int(ttl))
+        self.prefix = prefix
+
+    def get(self, session_id: int) -> Optional[ActiveSession]:
+        raw = self._r.get(f"{self.prefix}{session_id}")
+        return self._count(ActiveSession(**json.loads(raw)) if raw else None)
+
+    def put(self, state: ActiveSession) -> None:
+        self._r.set(f"{self.prefix}{state.id}", json.dumps(asdict(state)), ex=self.ttl)
+
+    def evict(self, session_id: int) -> None:
+        self._r.delete(f"{self.prefix}{session_id}")
+
+
+def make_cache(url: Optional[str] = SESSION_CACHE_URL, maxsize: int = SESSION_CACHE_SIZE) -> SessionCache:
+    if maxsize <= 0:
+        return SessionCache()
+    if url:
+        return RedisSessionCache(url)
+    return LocalSessionCache(maxsize)
@@ -0,0 +1,130 @@
+"""Rollup-статистика по детям: child_mode_stats.
+
+Строка (child_id, mode, difficulty) копит число завершённых сессий, попыток,
+правильных ответов и сумму reaction_ms. Обновляется в той же транзакции,
+в которой сессия закрывается (и в которой пишутся ответы, пришедшие после
+закрытия), поэтому эндпоинты статистики не читают attempts.
+
+Пересборка из сырых попыток (бэкфилл / починка):
+
+    python -m app.stats rebuild
+"""
+import sys
+
+from sqlalchemy import select, func, delete
+from sqlalchemy.orm import Session
+
+from . import models, queries
+
+
+def _insert_for(db: Session):
+    # upsert есть и в SQLite, и в PostgreSQL, но конструкторы у диалектов свои
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def session_totals(db: Session, session_id: int) -> tuple[int, int, int]:
+    """(attempts, correct, reaction_ms_sum) одной сессии одним агрегатом."""
+    row = db.execute(queries.session_totals(session_id)).one()
+    return int(row[0]), int(row[1]), int(row[2])
+
+
+def record_session(
+    db: Session,
+    session: models.Session,
+    attempts: int,
+    correct: int,
+    reaction_ms_sum: int,
+) -> None:
+    """Добавить только что закрытую сессию в rollup. Коммит — на вызывающем."""
+    _add(db, session, 1, attempts, correct, reaction_ms_sum)
+
+
+def record_late_attempts(
+    db: Session,
+    session: models.Session,
+    attempts: int,
+    correct: int,
+    reaction_ms_sum: int,
+) -> None:
+    """Ответы, записанные в уже закрытую сессию: дописать их в rollup без +1 к sessions."""
+    _add(db, session, 0, attempts, correct, reaction_ms_sum)
+
+
+def _add(db: Session, session, sessions: int, attempts: int, correct: int, reaction_ms_sum: int) -> None:
+    T = models.ChildModeStats
+    insert = _insert_for(db)
+
+    stmt = insert(T).values(
+        child_id=session.child_id,
+        mode=session.mode,
+        difficulty=session.difficulty,
+        sessions=sessions,
+        attempts=attempts,
+        correct=correct,
+        reaction_ms_sum=reaction_ms_sum,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[T.child_id, T.mode, T.difficulty],
+        set_={
+            "sessions": T.sessions + stmt.excluded.sessions,
+            "attempts": T.attempts + stmt.excluded.attempts,
+            "correct": T.correct + stmt.excluded.correct,
+            "reaction_ms_sum": T.reaction_ms_sum + stmt.excluded.reaction_ms_sum,
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild(db: Session) -> int:
+    """Пересчитать весь rollup из sessions/attempts одним INSERT ... SELECT."""
+    T = models.ChildModeStats
+    S = models.Session
+    A = models.Attempt
+
+    grouped = (
+        select(
+            S.child_id,
+            S.mode,
+            S.difficulty,
+            func.count(func.distinct(S.id)),
+            func.count(A.id),
+            func.coalesce(func.sum(A.correct), 0),
+            func.coalesce(func.sum(A.reaction_ms), 0),
+        )
+        .select_from(S)
+        .outerjoin(A, A.session_id == S.id)
+        .where(S.finished_at.isnot(None))
+        .group_by(S.child_id, S.mode, S.difficulty)
+    )
+
+    db.execute(delete(T))
+    db.execute(
+        T.__table__.insert().from_select(
+            ["child_id", "mode", "difficulty", "sessions", "attempts", "correct", "reaction_ms_sum"],
+            grouped,
+        )
+    )
+    db.commit()
+    return db.query(T).count()
+
+
+def main(argv: list[str]) -> int:
+    if argv[1:] != ["rebuild"]:
+        print("usage: python -m app.stats rebuild", file=sys.stderr)
+        return 2
+
+    from .db import Base, engine, SessionLocal
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        n = rebuild(db)
+    print(f"child_mode_stats rebuilt: {n} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,241 @@
+"""Синтетическая БД в масштабе продакшена: дети, игры, ответы, достижения.
+
+Распределения похожи на живые: у ребёнка своя точность и скорость, активность
+с длинным хвостом (немногие играют очень много), режимы и уровни с разными
+весами, серии правильных ответов (после верного ответа верный вероятнее),
+логнормальное время реакции, часть игр брошена на середине. Survival идёт до
+потери жизней. Всё выводится из --seed: одинаковая БД на любой машине.
+
+Строки пишутся пачками executemany с заранее известными id. После них
+пересчитывается rollup child_mode_stats и выдаются достижения (тот же
+backfill, что и для живой БД) — поэтому child_achievements согласован с
+историей.
+
+    DATABASE_URL=sqlite:///./big.db python -m app.synth --children 20000 --attempts 10000000
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import achievements, models, stats
+from .content import THEMES, VOCAB_CATEGORIES
+
+# как в main.START_PRESETS / main.SURVIVAL_LIVES
+ITEMS = {"easy": 6, "normal": 7, "hard": 9}
+EXPOSURE = {"easy": (1500, 1100, 2000), "normal": (1200, 800, 1800), "hard": (900, 500, 1400)}
+SURVIVAL_LIVES = {"easy": 4, "normal": 3, "hard": 2}
+SURVIVAL_MAX_ITEMS = 60
+
+MODE_WEIGHTS = {
+    "word_flash": 0.35,
+    "survival": 0.15,
+    "odd_one_out": 0.20,
+    "letter_builder": 0.15,
+    "vocab_spell": 0.15,
+}
+DIFFICULTY_WEIGHTS = {"easy": 0.3, "normal": 0.5, "hard": 0.2}
+# поправка к точности ребёнка на уровне
+DIFFICULTY_SKILL = {"easy": 0.07, "normal": 0.0, "hard": -0.10}
+ITEM_PREFIX = {
+    "word_flash": "wf", "survival": "wf", "odd_one_out": "ooo", "letter_builder": "lb", "vocab_spell": "vs",
+}
+
+AVG_ITEMS_PER_GAME = 8.5
+UNFINISHED_SHARE = 0.05
+HISTORY_DAYS = 180
+EPOCH = datetime(2025, 1, 1)
+
+NAMES = ("Аня", "Ваня", "Маша", "Петя", "Соня", "Миша", "Катя", "Лёва", "Даша", "Тима", "Вера", "Глеб")
+
+
+def _weighted(rnd: random.Random, weights: dict):
+    return rnd.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class _Writer:
+    """Копит строки и пишет их пачками в одной транзакции на пачку."""
+
+    def __init__(self, engine: Engine, chunk: int):
+        self.engine = engine
+        self.chunk = chunk
+        self.rows: dict = {models.Child: [], models.Session: [], models.Attempt: []}
+        self.counts = {"children": 0, "sessions": 0, "attempts": 0}
+
+    def add(self, model, row: dict) -> None:
+        self.rows[model].append(row)
+        if model is models.Attempt and len(self.rows[model]) >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.engine.begin() as conn:
+            # порядок важен для внешних ключей
+            for model, key in ((models.Child, "children"), (models.Session, "sessions"), (models.Attempt, "attempts")):
+                rows = self.rows[model]
+                if rows:
+                    conn.execute(insert(model.__table__), rows)
+                    self.counts[key] += len(rows)
+                    self.rows[model] = []
+
+
+def _play(rnd: random.Random, skill: float, speed_ms: float, mode: str, difficulty: str, items: int):
+    """Ответы одной игры: [(correct, reaction_ms), ...]."""
+    acc = min(0.98, max(0.2, skill + DIFFICULTY_SKILL[difficulty]))
+    out = []
+    lives = SURVIVAL_LIVES[difficulty]
+    prev = True
+    n = SURVIVAL_MAX_ITEMS if mode == "survival" else items
+    for _ in range(n):
+        # «горячая рука»: серии длиннее, чем у независимых бросков
+        p = acc + (1 - acc) * 0.3 if prev else acc * 0.8
+        correct = rnd.random() < p
+        reaction = rnd.lognormvariate(math.log(speed_ms), 0.35) * (1.0 if correct else 1.25)
+        out.append((correct, int(min(10_000, max(150, reaction)))))
+        prev = correct
+        if mode == "survival" and not correct:
+            lives -= 1
+            if lives <= 0:
+                break
+    return out
+
+
+def generate(
+    engine: Engine,
+    children: int,
+    attempts: int,
+    seed: int = 1,
+    chunk: int = 50_000,
+    progress=None,
+) -> dict:
+    """Заполнить пустую БД. Возвращает счётчики строк и время."""
+    rnd = random.Random(seed)
+    t0 = time.perf_counter()
+    w = _Writer(engine, chunk)
+
+    theme_ids = sorted(THEMES)
+    vocab_ids = sorted(VOCAB_CATEGORIES)
+
+    # активность с длинным хвостом: немногие играют на порядок больше медианы
+    activity = [rnd.paretovariate(1.3) for _ in range(children)]
+    total_activity = sum(activity)
+    games_total = attempts / AVG_ITEMS_PER_GAME
+
+    session_id = 0
+    attempt_id = 0
+    for child_id in range(1, children + 1):
+        w.add(models.Child, {"id": child_id, "name": f"{rnd.choice(NAMES)} {child_id}"})
+
+        skill = rnd.betavariate(6, 2)               # средняя точность ~0.75
+        speed_ms = rnd.lognormvariate(math.log(1300), 0.3)
+        games = max(1, round(activity[child_id - 1] / total_activity * games_total))
+        fav_theme = rnd.choice(theme_ids)
+        when = EPOCH + timedelta(minutes=rnd.randrange(HISTORY_DAYS * 24 * 60))
+        exposure = {d: e[0] for d, e in EXPOSURE.items()}
+
+        for _ in range(games):
+            session_id += 1
+            mode = _weighted(rnd, MODE_WEIGHTS)
+            difficulty = _weighted(rnd, DIFFICULTY_WEIGHTS)
+            if mode == "vocab_spell":
+                theme_id = rnd.choice(vocab_ids)
+            else:
+                theme_id = fav_theme if rnd.random() < 0.6 else rnd.choice(theme_ids)
+
+            answers = _play(rnd, skill, speed_ms, mode, difficulty, ITEMS[difficulty])
+            unfinished = rnd.random() < UNFINISHED_SHARE
+            if unfinished:
+                answers = answers[: rnd.randrange(len(answers) + 1)]
+
+            wrong = sum(1 for c, _ in answers if not c)
+            exp_ms = exposure[difficulty]
+            w.add(models.Session, {
+                "id": session_id,
+                "child_id": child_id,
+                "mode": mode,
+                "difficulty": difficulty,
+                "theme_id": theme_id,
+                "started_at": when,
+                "finished_at": None if unfinished else when + timedelta(seconds=10 + 4 * len(answers)),
+                "exposure_ms": exp_ms,
+                "items_total": ITEMS[difficulty],
+                "wrong_count": wrong if mode == "survival" else 0,
+                "lives_left": max(0, SURVIVAL_LIVES[difficulty] - wrong) if mode == "survival" else None,
+            })
+            prefix = ITEM_PREFIX[mode]
+            for i, (correct, reaction) in enumerate(answers):
+                attempt_id += 1
+                w.add(models.Attempt, {
+                    "id": attempt_id,
+                    "session_id": session_id,
+                    "item_id": f"{prefix}_t{theme_id}_{difficulty}_{i}",
+                    "correct": 1 if correct else 0,
+                    "reaction_ms": reaction,
+                    "shown_ms": exp_ms,
+                })
+
+            if not unfinished and answers:
+                # адаптация экспозиции, как на финише
+                acc = 1 - wrong / len(answers)
+                lo, hi = EXPOSURE[difficulty][1:]
+                if acc > 0.8:
+                    exposure[difficulty] = max(lo, exp_ms - 50)
+                elif acc < 0.6:
+                    exposure[difficulty] = min(hi, exp_ms + 100)
+
+            # следующая игра: через минуты в тот же день или через дни
+            when += timedelta(minutes=rnd.randint(2, 6)) if rnd.random() < 0.7 else timedelta(days=rnd.randint(1, 3))
+
+        if progress and child_id % 1000 == 0:
+            progress({**w.counts, "elapsed_s": time.perf_counter() - t0})
+
+    w.flush()
+    return {**w.counts, "elapsed_s": time.perf_counter() - t0}
+
+
+def _print_progress(r: dict) -> None:
+    rate = r["attempts"] / r["elapsed_s"] if r["elapsed_s"] else 0.0
+    print(f"  {r['children']:>10,} children  {r['sessions']:>12,} games  {r['attempts']:>14,} attempts  "
+          f"{rate:>10,.0f} attempts/s", flush=True)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.synth", description="Заполнить пустую БД синтетической историей")
+    ap.add_argument("--children", type=int, default=1000)
+    ap.add_argument("--attempts", type=int, default=1_000_000, help="примерное число ответов всего")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--chunk", type=int, default=50_000, help="ответов на пачку INSERT")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv[1:])
+
+    from .db import engine
+    from .migrations import upgrade
+
+    upgrade(engine)
+    with Session(bind=engine) as db:
+        if db.execute(select(func.count()).select_from(models.Child)).scalar_one():
+            print("database is not empty; point DATABASE_URL at a fresh file", file=sys.stderr)
+            return 2
+
+    progress = None if args.quiet else _print_progress
+    r = generate(engine, args.children, args.attempts, seed=args.seed, chunk=args.chunk, progress=progress)
+    print(f"rows: {r['children']:,} children, {r['sessions']:,} games, {r['attempts']:,} attempts "
+          f"in {r['elapsed_s']:.1f}s")
+
+    t0 = time.perf_counter()
+    with Session(bind=engine) as db:
+        n = stats.rebuild(db)
+    print(f"child_mode_stats rebuilt: {n} rows in {time.perf_counter() - t0:.1f}s")
+
+    b = achievements.backfill(engine, chunk=args.chunk)
+    print(f"achievements: {b['unlocked']:,} unlocks in {b['elapsed_s']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,128 @@
+"""Общие помощники бенчмарков: локальный uvicorn на временной БД и простой HTTP-клиент."""
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class Server:
+    host: str
+    port: int
+    log_path: str
+    db_path: str
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def read_log(self) -> str:
+        with open(self.log_path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(env: dict | None = None, workers: int = 1, startup_timeout: float = 30.0):
+    """Поднять app.main:app на свободном порту с чистой SQLite-БД во временной папке."""
+    tmpdir = tempfile.mkdtemp(prefix="rg-bench-")
+    db_path = os.path.join(tmpdir, "bench.db")
+    log_path = os.path.join(tmpdir, "server.log")
+    port = _free_port()
+
+    proc_env = dict(os.environ)
+    proc_env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    proc_env.update(env or {})
+
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=proc_env, stdout=log, stderr=subprocess.STDOUT)
+    server = Server("127.0.0.1", port, log_path, db_path)
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}:\n{server.read_log()}")
+            try:
+                status, _ = Client(server).get("/api/themes")
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server did not start in {startup_timeout}s:\n{server.read_log()}")
+            time.sleep(0.1)
+
+        yield server
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        log.close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class Client:
+    """Keep-alive HTTP/1.1 клиент на одном соединении (один на поток)."""
+
+    def __init__(self, server: Server, timeout: float = 30.0):
+        self.server = server
+        self.timeout = timeout
+        self.conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.server.host, self.server.port, timeout=self.timeout)
+        return self.conn
+
+    def request(self, method: str, path: str, body=None) -> tuple[int, object]:
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = raw.decode("utf-8", errors="replace")
+        return resp.status, payload
+
+    def get(self, path: str):
+        return self.request("GET", path)
+
+    def post(self, path: str, body=None):
+        return self.request("POST", path, body)
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,109 @@
+"""Сравнение sync- и async-режима (DB_ASYNC) по максимальной устойчивой пропускной способности.
+
+Для каждого режима поднимается отдельный uvicorn на одной и той же машине,
+затем на нескольких уровнях конкурентности гоняется смесь запросов:
+запись ответов (POST /attempt) и чтение /api/themes. Итог — максимум
+req/s по уровням для каждого режима.
+
+    python -m bench.async_vs_sync --duration 10 --concurrency 8 32 64
+    python -m bench.async_vs_sync --json report.json
+"""
+import argparse
+import json
+import threading
+import time
+
+from bench._server import Client, serve
+
+# на 3 записи — 1 чтение каталога, примерно как на уроке
+MIX = ("attempt", "attempt", "attempt", "themes")
+
+
+def _setup(server, sessions_n: int) -> list[int]:
+    c = Client(server)
+    _, child = c.post("/api/children", {"name": "bench"})
+    ids = []
+    for _ in range(sessions_n):
+        _, s = c.post("/api/sessions/start", {"child_id": child["id"], "mode": "word_flash"})
+        ids.append(s["session_id"])
+    c.close()
+    return ids
+
+
+def _run_level(server, session_ids: list[int], concurrency: int, duration: float) -> dict:
+    stop = time.monotonic() + duration
+    done = [0] * concurrency
+    errors = [0] * concurrency
+
+    def worker(n: int):
+        c = Client(server)
+        sid = session_ids[n % len(session_ids)]
+        i = 0
+        while time.monotonic() < stop:
+            kind = MIX[i % len(MIX)]
+            i += 1
+            try:
+                if kind == "attempt":
+                    status, _ = c.post(
+                        f"/api/sessions/{sid}/attempt",
+                        {"item_id": f"b{i}", "correct": i % 4 != 0, "reaction_ms": 700, "shown_ms": 1200},
+                    )
+                else:
+                    status, _ = c.get("/api/themes")
+            except OSError:
+                status = 0
+            if status == 200:
+                done[n] += 1
+            else:
+                errors[n] += 1
+        c.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+
+    return {
+        "concurrency": concurrency,
+        "requests": sum(done),
+        "errors": sum(errors),
+        "rps": sum(done) / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_mode(async_mode: bool, levels: list[int], duration: float) -> dict:
+    env = {"DB_ASYNC": "1" if async_mode else "0"}
+    with serve(env=env) as server:
+        session_ids = _setup(server, max(levels))
+        _run_level(server, session_ids, min(levels), 1.0)  # прогрев
+        results = [_run_level(server, session_ids, c, duration) for c in levels]
+
+    best = max(results, key=lambda r: r["rps"])
+    return {"mode": "async" if async_mode else "sync", "levels": results, "max_rps": best["rps"]}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--duration", type=float, default=10.0, help="секунд на каждый уровень")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64])
+    ap.add_argument("--json", help="куда сохранить отчёт")
+    args = ap.parse_args()
+
+    report = {"duration_s": args.duration, "modes": []}
+    for async_mode in (False, True):
+        r = bench_mode(async_mode, args.concurrency, args.duration)
+        report["modes"].append(r)
+        for lvl in r["levels"]:
+            print(f"{r['mode']:>5}  c={lvl['concurrency']:<4} {lvl['rps']:8.1f} req/s  errors={lvl['errors']}")
+        print(f"{r['mode']:>5}  max sustained: {r['max_rps']:.1f} req/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
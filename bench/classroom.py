@@ -0,0 +1,206 @@
+"""Нагрузочный прогон «класс за планшетами».
+
+Поднимает app.main:app на локальном uvicorn с временной SQLite-БД и гоняет
+K детей параллельно. Каждый проходит тот же путь, что static/js/game.wordflash.js:
+/api/themes → /api/sessions/start → N × /attempt → /finish, по кругу через все
+пять режимов (survival — до потери жизней). Итог — p50/p95/p99 по маршрутам,
+пропускная способность, ошибки блокировок SQLite и JSON-отчёт для сравнения
+между релизами.
+
+    python -m bench.classroom --children 30 --games 5
+    python -m bench.classroom --children 60 --think-ms 300 --env ATTEMPT_BUFFER=flush --json after.json
+    python -m bench.classroom --baseline before.json      # разница p50/p95/p99 с прошлым отчётом
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+from app.content import THEMES, VOCAB_CATEGORIES
+from bench._server import Client, serve
+
+MODES = ("word_flash", "survival", "odd_one_out", "letter_builder", "vocab_spell")
+DIFFICULTIES = ("easy", "normal", "hard")
+# vocab_spell играет словарными категориями, остальные режимы — темами;
+# без подходящего theme_id сервер молча отдаёт колоду word_flash
+THEME_IDS = sorted(THEMES)
+VOCAB_IDS = sorted(VOCAB_CATEGORIES)
+
+# маркеры блокировок SQLite в логе сервера
+LOCK_MARKERS = ("database is locked", "database table is locked")
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    k = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def call(self, client: Client, route: str, method: str, path: str, body=None):
+        t0 = time.perf_counter()
+        try:
+            status, payload = client.request(method, path, body)
+        except OSError:
+            status, payload = 0, None
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.latency[route].append(ms)
+            if status != 200:
+                self.errors[route][status] += 1
+        return status, payload
+
+    def routes(self) -> dict:
+        out = {}
+        for route, values in sorted(self.latency.items()):
+            values = sorted(values)
+            errors = dict(self.errors.get(route, {}))
+            out[route] = {
+                "count": len(values),
+                "errors": sum(errors.values()),
+                "errors_by_status": {str(k): v for k, v in sorted(errors.items())},
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "max_ms": values[-1],
+            }
+        return out
+
+
+def play_child(server, rec: Recorder, n: int, games: int, accuracy: float, think_s: float, seed: int) -> int:
+    rnd = random.Random(seed * 1000 + n)
+    c = Client(server)
+    finished = 0
+    try:
+        status, child = rec.call(c, "POST /api/children", "POST", "/api/children", {"name": f"kid{n}"})
+        if status != 200:
+            return 0
+        rec.call(c, "GET /api/themes", "GET", "/api/themes")
+
+        for g in range(games):
+            mode = MODES[(n + g) % len(MODES)]
+            difficulty = DIFFICULTIES[(n + g) % len(DIFFICULTIES)]
+            theme_ids = VOCAB_IDS if mode == "vocab_spell" else THEME_IDS
+            status, s = rec.call(c, "POST /api/sessions/start", "POST", "/api/sessions/start", {
+                "child_id": child["id"], "mode": mode, "difficulty": difficulty,
+                "theme_id": theme_ids[(n + g) % len(theme_ids)],
+            })
+            if status != 200:
+                continue
+            sid = s["session_id"]
+
+            for it in s["items"]:
+                if think_s:
+                    time.sleep(rnd.uniform(0.5, 1.5) * think_s)
+                status, out = rec.call(c, "POST /api/sessions/{id}/attempt", "POST", f"/api/sessions/{sid}/attempt", {
+                    "item_id": it["item_id"],
+                    "correct": rnd.random() < accuracy,
+                    "reaction_ms": rnd.randint(400, 2500),
+                    "shown_ms": it["exposure_ms"],
+                })
+                if status == 200 and out.get("finished"):
+                    break
+
+            status, _ = rec.call(c, "POST /api/sessions/{id}/finish", "POST", f"/api/sessions/{sid}/finish")
+            if status == 200:
+                finished += 1
+    finally:
+        c.close()
+    return finished
+
+
+def run(children: int, games: int, accuracy: float, think_ms: float, seed: int, env: dict, workers: int) -> dict:
+    rec = Recorder()
+    done = [0] * children
+    with serve(env=env, workers=workers) as server:
+        def worker(n: int):
+            done[n] = play_child(server, rec, n, games, accuracy, think_ms / 1000, seed)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(children)]
+        t0 = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - t0
+        log = server.read_log()
+
+    routes = rec.routes()
+    requests = sum(r["count"] for r in routes.values())
+    return {
+        "config": {
+            "children": children, "games": games, "accuracy": accuracy,
+            "think_ms": think_ms, "seed": seed, "workers": workers, "env": env,
+        },
+        "elapsed_s": elapsed,
+        "requests": requests,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "games_finished": sum(done),
+        "errors": sum(r["errors"] for r in routes.values()),
+        "lock_errors": sum(log.count(m) for m in LOCK_MARKERS),
+        "routes": routes,
+    }
+
+
+def _print(report: dict) -> None:
+    print(f"{'route':<34} {'count':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}  ms")
+    for route, r in report["routes"].items():
+        print(f"{route:<34} {r['count']:>7} {r['errors']:>5} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(
+        f"{report['requests']} requests in {report['elapsed_s']:.1f}s: {report['throughput_rps']:.1f} req/s, "
+        f"games finished {report['games_finished']}, errors {report['errors']}, "
+        f"SQLite lock errors {report['lock_errors']}"
+    )
+
+
+def _print_diff(report: dict, baseline: dict) -> None:
+    print(f"\nvs baseline ({baseline['config']}):")
+    for route, r in report["routes"].items():
+        b = baseline["routes"].get(route)
+        if b is None:
+            continue
+        deltas = "  ".join(
+            f"{q} {r[f'{q}_ms'] - b[f'{q}_ms']:+8.1f}" for q in ("p50", "p95", "p99")
+        )
+        print(f"{route:<34} {deltas}")
+    print(f"{'throughput_rps':<34} {report['throughput_rps'] - baseline['throughput_rps']:+.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--children", type=int, default=30, help="сколько детей играют одновременно")
+    ap.add_argument("--games", type=int, default=5, help="игр на ребёнка (режимы по кругу)")
+    ap.add_argument("--accuracy", type=float, default=0.8, help="доля правильных ответов")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="средняя пауза перед ответом (0 — без пауз)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workers", type=int, default=1, help="воркеров uvicorn")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="окружение сервера")
+    ap.add_argument("--json", help="куда сохранить отчёт")
+    ap.add_argument("--baseline", help="прошлый JSON-отчёт для сравнения")
+    args = ap.parse_args()
+
+    env = dict(kv.split("=", 1) for kv in args.env)
+    report = run(args.children, args.games, args.accuracy, args.think_ms, args.seed, env, args.workers)
+    _print(report)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            _print_diff(report, json.load(f))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
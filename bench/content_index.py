@@ -0,0 +1,184 @@
+"""Микро-бенчмарк генераторов контента: индекс при импорте против старой реализации.
+
+Старые генераторы (копирование пула через _pool_for, полный shuffle
+дистракторов на каждое задание) сохранены ниже как эталон для сравнения.
+
+    python -m bench.content_index --repeat 2000
+"""
+import argparse
+import random
+import time
+
+from app import content
+from app.lexicon import DictStore
+from app.content import (
+    WordFlashItem,
+    THEMES,
+    VOCAB_CATEGORIES,
+    DEFAULT_THEME_ID,
+    make_word_flash_items,
+    make_odd_one_out_items,
+    make_letter_builder_items,
+    make_vocab_spell_items,
+)
+
+
+# ---- эталон: генераторы до появления индекса ----
+
+def _legacy_pool_for(theme_id, difficulty):
+    theme = THEMES[theme_id]
+    words = (
+        theme.get(difficulty)
+        or theme.get("normal")
+        or theme.get("easy")
+        or theme.get("hard")
+        or []
+    )
+    return list(words)
+
+
+def legacy_word_flash(n, difficulty, theme_id, options_k=4):
+    words = _legacy_pool_for(theme_id, difficulty)
+    pool = words[:]
+    random.shuffle(pool)
+    if len(pool) >= n:
+        pool = pool[:n]
+    items = []
+    for i in range(n):
+        target = pool[i % len(pool)]
+        distractors = [w for w in words if w != target]
+        random.shuffle(distractors)
+        options = [target] + distractors[: max(0, options_k - 1)]
+        random.shuffle(options)
+        items.append(WordFlashItem(item_id=f"wf_t{theme_id}_{difficulty}_{i}", target=target, options=options))
+    return items
+
+
+def legacy_odd_one_out(n, difficulty, theme_id, options_k=4):
+    base_words = _legacy_pool_for(theme_id, difficulty)
+    base_pool = base_words[:]
+    random.shuffle(base_pool)
+    other_theme_ids = [tid for tid in THEMES.keys() if tid != theme_id] or [DEFAULT_THEME_ID]
+    items = []
+    for i in range(n):
+        group_k = max(2, options_k - 1)
+        group = []
+        while len(group) < group_k:
+            w = base_pool[(i + len(group)) % len(base_pool)]
+            if w not in group:
+                group.append(w)
+        odd_words = _legacy_pool_for(random.choice(other_theme_ids), difficulty)
+        odd = random.choice([w for w in odd_words if w not in group] or odd_words)
+        options = list(dict.fromkeys(group + [odd]))
+        while len(options) < options_k:
+            options.append(random.choice([w for w in base_words if w not in options] or base_words))
+        options = options[:options_k]
+        random.shuffle(options)
+        items.append(WordFlashItem(
+            item_id=f"ooo_t{theme_id}_{difficulty}_{i}", target="", options=options,
+            prompt="Выбери лишнее слово", correct=odd,
+        ))
+    return items
+
+
+def legacy_letter_builder(n, difficulty, theme_id):
+    words = _legacy_pool_for(theme_id, difficulty)
+    pool = words[:]
+    random.shuffle(pool)
+    if len(pool) >= n:
+        pool = pool[:n]
+    items = []
+    for i in range(n):
+        w = pool[i % len(pool)]
+        letters = list(w)
+        random.shuffle(letters)
+        items.append(WordFlashItem(item_id=f"lb_t{theme_id}_{difficulty}_{i}", target="", options=letters, correct=w))
+    return items
+
+
+def legacy_vocab_spell(n, difficulty, theme_id):
+    theme = VOCAB_CATEGORIES[theme_id]
+    rows = theme.get(difficulty) or theme.get("normal") or []
+    pool = rows[:]
+    random.shuffle(pool)
+    if len(pool) >= n:
+        pool = pool[:n]
+    items = []
+    for i in range(n):
+        row = pool[i % len(pool)]
+        word = row["word"]
+        miss_idx = row["missing_index"]
+        correct = word[miss_idx]
+        options = list(dict.fromkeys([correct] + row["options"]))
+        random.shuffle(options)
+        items.append(WordFlashItem(
+            item_id=f"vs_t{theme_id}_{difficulty}_{i}", target="", options=options,
+            prompt=word[:miss_idx] + "_" + word[miss_idx + 1:], correct=correct,
+        ))
+    return items
+
+
+# ---- замер ----
+
+BIG_THEME_ID = 999
+
+
+def _add_big_theme(pool_size: int) -> None:
+    # синтетическая тема размером с будущий лексикон: видно O(n·|pool|) против O(n·k)
+    words = [f"слово{i}" for i in range(pool_size)]
+    THEMES[BIG_THEME_ID] = {"name": "bench", "easy": words, "normal": words, "hard": words}
+    content.use_store(DictStore(THEMES, VOCAB_CATEGORIES))
+
+
+def _time(fn, calls, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for args in calls:
+            fn(*args)
+    return (time.perf_counter() - t0) / (repeat * len(calls)) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=1000)
+    ap.add_argument("--items", type=int, default=9, help="заданий в сессии")
+    ap.add_argument("--options", type=int, default=5)
+    ap.add_argument("--pool-size", type=int, default=5000, help="слов в синтетической большой теме")
+    args = ap.parse_args()
+
+    n, k = args.items, args.options
+    theme_ids = list(THEMES)
+    word_calls = [(n, d, tid, k) for tid in theme_ids for d in ("easy", "normal", "hard")]
+    lb_calls = [(n, d, tid) for tid in theme_ids for d in ("easy", "normal", "hard")]
+    vs_calls = [(n, d, tid) for tid in VOCAB_CATEGORIES for d in ("easy", "normal", "hard")]
+
+    cases = [
+        ("word_flash", legacy_word_flash, make_word_flash_items, word_calls),
+        ("odd_one_out", legacy_odd_one_out, make_odd_one_out_items, word_calls),
+        ("letter_builder", legacy_letter_builder, make_letter_builder_items, lb_calls),
+        ("vocab_spell", legacy_vocab_spell, make_vocab_spell_items, vs_calls),
+    ]
+
+    print(f"{'generator':<24}{'legacy µs':>12}{'indexed µs':>12}{'speedup':>10}")
+
+    def run(cases):
+        for name, legacy, indexed, calls in cases:
+            old = _time(legacy, calls, args.repeat)
+            new = _time(indexed, calls, args.repeat)
+            print(f"{name:<24}{old:12.1f}{new:12.1f}{old / new:9.2f}x")
+
+    run(cases)
+
+    # большая тема добавляется после: иначе она попадёт в "чужие" темы odd_one_out
+    _add_big_theme(args.pool_size)
+    big_word_calls = [(n, "normal", BIG_THEME_ID, k)]
+    big_lb_calls = [(n, "normal", BIG_THEME_ID)]
+    run([
+        (f"word_flash/{args.pool_size}", legacy_word_flash, make_word_flash_items, big_word_calls),
+        (f"odd_one_out/{args.pool_size}", legacy_odd_one_out, make_odd_one_out_items, big_word_calls),
+        (f"letter_builder/{args.pool_size}", legacy_letter_builder, make_letter_builder_items, big_lb_calls),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Микро-бенчмарки с сохранёнными базовыми замерами и порогом регрессии.
+
+Замеряются генераторы content.py по всем темам, уровням и размерам колоды,
+а также статистика ребёнка (_calc_child_stats_by_mode, _get_stats) на
+синтетической истории в 10, 1k и 100k ответов. Время — лучшее из нескольких
+раундов, в мкс на вызов.
+
+    python -m bench.micro --save          # записать базу (bench/baselines/micro.json)
+    python -m bench.micro                 # сравнить с базой; код 1, если что-то
+                                          # стало медленнее порога (по умолчанию +25%)
+    python -m bench.micro -k word_flash --threshold 0.1
+
+База зависит от машины, поэтому не коммитится: снимите её на своей машине
+до изменения и сравните после.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+# статистике нужна БД, а app.main при импорте применяет миграции к DATABASE_URL —
+# до любого импорта app направляем её во временный файл
+_TMPDIR = tempfile.mkdtemp(prefix="rg-micro-")
+atexit.register(shutil.rmtree, _TMPDIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMPDIR, 'micro.db')}"
+
+from app import content  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+
+DIFFICULTIES = ("easy", "normal", "hard")
+DECK_SIZES = (6, 7, 9, 20)
+HISTORY_SIZES = (10, 1_000, 100_000)
+MODES = ("word_flash", "survival", "odd_one_out", "letter_builder", "vocab_spell")
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float) -> float:
+    """Лучшее время одного вызова fn, мкс. GC на время замера выключен, как в timeit."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(fn, rounds, min_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _measure(fn: Callable[[], object], rounds: int, min_time: float) -> float:
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(rounds - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best * 1e6
+
+
+# ---- генераторы ----
+
+def generator_cases() -> dict[str, Callable[[], object]]:
+    rng = random.Random(0)
+    theme_ids = list(content.THEMES)
+    vocab_ids = list(content.VOCAB_CATEGORIES)
+
+    def over(fn, ids, n, **kw):
+        calls = [(tid, d) for tid in ids for d in DIFFICULTIES]
+
+        def run():
+            for tid, d in calls:
+                fn(n, difficulty=d, theme_id=tid, rng=rng, **kw)
+        return run
+
+    cases = {}
+    for n in DECK_SIZES:
+        cases[f"gen/word_flash/n={n}"] = over(content.make_word_flash_items, theme_ids, n, options_k=4)
+        cases[f"gen/odd_one_out/n={n}"] = over(content.make_odd_one_out_items, theme_ids, n, options_k=4)
+        cases[f"gen/letter_builder/n={n}"] = over(content.make_letter_builder_items, theme_ids, n)
+        cases[f"gen/vocab_spell/n={n}"] = over(content.make_vocab_spell_items, vocab_ids, n)
+    return cases
+
+
+# ---- статистика ----
+
+def _seed_history(db, attempts_n: int) -> int:
+    """Ребёнок с завершёнными играми по 10 ответов во всех режимах. Возвращает его id."""
+    from sqlalchemy import insert
+
+    from app import models
+
+    child = models.Child(name=f"bench{attempts_n}")
+    db.add(child)
+    db.flush()
+
+    rnd = random.Random(attempts_n)
+    sessions_n = max(1, attempts_n // 10)
+    t0 = datetime(2024, 1, 1)
+    first_id = (db.query(models.Session.id).order_by(models.Session.id.desc()).limit(1).scalar() or 0) + 1
+    db.execute(insert(models.Session), [
+        {
+            "id": first_id + i,
+            "child_id": child.id,
+            "mode": MODES[i % len(MODES)],
+            "difficulty": DIFFICULTIES[i % len(DIFFICULTIES)],
+            "theme_id": 1,
+            "started_at": t0 + timedelta(minutes=i),
+            "finished_at": t0 + timedelta(minutes=i, seconds=90),
+            "exposure_ms": 1200,
+            "items_total": 10,
+        }
+        for i in range(sessions_n)
+    ])
+    db.execute(insert(models.Attempt), [
+        {
+            "session_id": first_id + i // 10,
+            "item_id": f"b{i}",
+            "correct": 1 if rnd.random() < 0.8 else 0,
+            "reaction_ms": rnd.randint(400, 2500),
+            "shown_ms": 1200,
+        }
+        for i in range(attempts_n)
+    ])
+    db.commit()
+    return child.id
+
+
+def stats_cases() -> dict[str, Callable[[], object]]:
+    from app import main, models, stats
+    from app.db import SessionLocal
+
+    db = SessionLocal()
+    children = {n: _seed_history(db, n) for n in HISTORY_SIZES}
+    stats.rebuild(db)
+
+    cases = {}
+    for n, child_id in children.items():
+        child = db.get(models.Child, child_id)
+        cases[f"stats/child_by_mode/attempts={n}"] = lambda child=child: main._calc_child_stats_by_mode(child, db)
+        cases[f"stats/get_stats/attempts={n}"] = lambda child_id=child_id: main._get_stats(db, child_id)
+    return cases
+
+
+# ---- база и сравнение ----
+
+def load_baseline(path: str) -> dict[str, float]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results_us"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: dict[str, float]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {"created": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "results_us": results}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-k", dest="filter", help="только кейсы, содержащие подстроку")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save", action="store_true", help="записать результаты как новую базу")
+    ap.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление, доля (0.25 = +25%%)")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.05, help="секунд на раунд, не меньше")
+    ap.add_argument("--retries", type=int, default=2, help="перезамеров кейса, превысившего порог")
+    args = ap.parse_args()
+
+    cases = generator_cases()
+    if not args.filter or "stats" in args.filter:
+        cases.update(stats_cases())
+    if args.filter:
+        cases = {k: v for k, v in cases.items() if args.filter in k}
+
+    baseline = {} if args.save else load_baseline(args.baseline)
+    results: dict[str, float] = {}
+    regressions = []
+
+    print(f"{'case':<36}{'µs':>12}{'base µs':>12}{'ratio':>8}")
+    for name, fn in cases.items():
+        us = measure(fn, args.rounds, args.min_time)
+        results[name] = us
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<36}{us:12.1f}{'-':>12}{'':>8}")
+            continue
+        # подозрение на регрессию перепроверяем: разовый шум не должен валить прогон
+        for _ in range(args.retries):
+            if us / base <= 1 + args.threshold:
+                break
+            us = min(us, measure(fn, args.rounds, args.min_time))
+        results[name] = us
+        ratio = us / base
+        mark = ""
+        if ratio > 1 + args.threshold:
+            mark = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36}{us:12.1f}{base:12.1f}{ratio:7.2f}x{mark}")
+
+    if args.save:
+        if args.filter:
+            # частичный прогон обновляет только свои кейсы
+            merged = load_baseline(args.baseline)
+            merged.update(results)
+            results = merged
+        save_baseline(args.baseline, results)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --save first", file=sys.stderr)
+        return 0
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than +{args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print(f"ok: no case slower than +{args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
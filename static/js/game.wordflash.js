@@ -74,6 +74,134 @@ async function api(path, options = {}) {
 }
 function $(id) { return document.getElementById(id); }
 
+// ===================== GAME CHANNEL (WebSocket) =====================
+// Attempts and finish of one session go over /ws/sessions/{id}. A reply means
+// the server has committed the message. If the socket can't open or drops,
+// everything still unanswered (and everything after) goes over HTTP.
+const WS_OPEN_TIMEOUT_MS = 3000;
+let channel = null;
+
+function openChannel(sessionId) {
+  closeChannel();
+  if (!window.WebSocket) return;
+
+  const proto = location.protocol === "https:" ? "wss" : "ws";
+  const ws = new WebSocket(`${proto}://${location.host}/ws/sessions/${sessionId}`);
+  const ch = { ws, sessionId, seq: 0, pending: new Map(), dead: false };
+
+  ch.open = new Promise(resolve => {
+    const timer = setTimeout(() => { resolve(false); ws.close(); }, WS_OPEN_TIMEOUT_MS);
+    ws.onopen = () => { clearTimeout(timer); resolve(true); };
+    ws.onclose = () => {
+      clearTimeout(timer);
+      resolve(false);
+      ch.dead = true;
+      // unanswered messages -> HTTP, in the order they were sent
+      for (const p of ch.pending.values()) p.viaHttp().then(p.resolve, p.reject);
+      ch.pending.clear();
+    };
+  });
+
+  ws.onmessage = ev => {
+    let msg;
+    try { msg = JSON.parse(ev.data); } catch (e) { return; }
+    const p = ch.pending.get(msg.seq);
+    if (!p) return;
+    ch.pending.delete(msg.seq);
+    if (msg.type === "error") p.reject(new Error(JSON.stringify(msg.detail)));
+    else p.resolve(msg);
+  };
+
+  channel = ch;
+}
+
+function closeChannel() {
+  if (channel && !channel.dead) channel.ws.close();
+  channel = null;
+}
+
+async function channelCall(type, body, viaHttp) {
+  const ch = channel;
+  if (!ch || ch.dead || !(await ch.open) || ch.dead) return viaHttp();
+  return new Promise((resolve, reject) => {
+    const seq = ++ch.seq;
+    ch.pending.set(seq, { resolve, reject, viaHttp });
+    ch.ws.send(JSON.stringify({ type, seq, ...body }));
+  });
+}
+
+let outstandingAttempts = [];   // attempts we did not wait for (non-survival)
+
+// ===================== OFFLINE (see storage.js) =====================
+// The whole game is also recorded locally: start params + attempts with UUIDs.
+// If the network is gone at start, during the game or at finish, the record is
+// queued and uploaded later to /api/sessions/upload (deduplicated by UUID).
+let offlineGame = null;
+
+function recordAttempt(attempt) {
+  if (!offlineGame) return;
+  offlineGame.attempts.push(attempt);
+  RGStorage.saveCurrent(offlineGame);
+}
+
+function markNeedsUpload() {
+  if (!offlineGame) return;
+  offlineGame.needs_upload = true;
+  RGStorage.saveCurrent(offlineGame);
+}
+
+function queueOfflineGame(finished) {
+  if (!offlineGame) return;
+  const { needs_upload, ...game } = offlineGame;
+  if (finished) game.finished_at = new Date().toISOString();
+  RGStorage.enqueue(game);
+  RGStorage.clearCurrent();
+  offlineGame = null;
+}
+
+// Result computed on the device, same shape as SessionFinishOut
+function localResult() {
+  const list = offlineGame ? offlineGame.attempts : [];
+  const total = list.length;
+  const correct = list.filter(a => a.correct).length;
+  const reaction = list.reduce((s, a) => s + a.reaction_ms, 0);
+  return {
+    session_id: session.session_id,
+    accuracy: total ? correct / total : 0,
+    avg_reaction_ms: total ? reaction / total : 0,
+    next_exposure_ms: session.exposure_ms,
+    new_achievements: [],
+  };
+}
+
+function sendAttempt(sessionId, attempt) {
+  return channelCall("attempt", attempt, () => api(`/api/sessions/${sessionId}/attempt`, {
+    method: "POST",
+    body: JSON.stringify(attempt)
+  }));
+}
+
+// next=true: the server also starts the next round (same mode/theme/difficulty)
+// and returns it as out.next_session
+function sendFinish(sessionId, next = false) {
+  const pending = outstandingAttempts;
+  outstandingAttempts = [];
+  return channelCall("finish", { next }, async () => {
+    // over HTTP the order is not guaranteed: let the attempts land first
+    await Promise.allSettled(pending);
+    return api(`/api/sessions/${sessionId}/finish${next ? "?next=1" : ""}`, { method: "POST" });
+  });
+}
+
+// Next round pre-created by finish?next=1; used by start() if the settings didn't change
+let nextSession = null;   // { childId, data }
+
+// finish?next=1 only when the player is replaying: the round was started with the
+// same child/mode/difficulty/theme as the one before it. A single game, or the last
+// one before switching settings, then leaves no unused session on the server.
+let lastRoundKey = null;
+let roundsInRow = 0;
+
 // ===================== AUDIO (OGG) =====================
 // Notes:
 // - Put files under: static/audio/<type>/<file>.ogg
@@ -142,6 +270,54 @@ function stopAudio(force = false) {
   }
 }
 
+// ---- Sprites: one OGG per category (python -m app.audio build) ----
+// Manifest from /api/audio/sprites: { type: { url, clips: { file: [offsetMs, durationMs] } } }.
+// Sprites are fetched and decoded up front; a clip then plays by offset with no request.
+// No manifest / no Web Audio / decode error -> per-file Audio below, as before.
+let audioCtx = null;
+const sprites = {};         // type -> { buffer, clips }
+
+async function loadAudioSprites() {
+  const Ctx = window.AudioContext || window.webkitAudioContext;
+  if (!Ctx) return;
+  const manifest = await api("/api/audio/sprites");
+  audioCtx = audioCtx || new Ctx();
+  await Promise.all(Object.entries(manifest).map(async ([type, s]) => {
+    try {
+      const res = await fetch(s.url);
+      if (!res.ok) return;
+      const buffer = await audioCtx.decodeAudioData(await res.arrayBuffer());
+      sprites[type] = { buffer, clips: s.clips };
+    } catch (e) {
+      // this category stays on per-file playback
+    }
+  }));
+}
+
+// Plays [offset, duration] of a sprite; returns an Audio-like handle for currentAudio.
+function playSprite(sprite, clip, done) {
+  if (audioCtx.state === "suspended") audioCtx.resume().catch(() => {});
+  const [offsetMs, durationMs] = clip;
+  const src = audioCtx.createBufferSource();
+  src.buffer = sprite.buffer;
+  src.connect(audioCtx.destination);
+
+  const handle = { ended: false, currentTime: 0 };
+  handle.pause = () => {
+    if (handle.ended) return;
+    handle.ended = true;
+    try { src.stop(); } catch (e) {}
+    done();
+  };
+  src.onended = () => {
+    if (handle.ended) return;
+    handle.ended = true;
+    done();
+  };
+  src.start(0, offsetMs / 1000, durationMs / 1000);
+  return handle;
+}
+
 function pick(arr) {
   return arr[Math.floor(Math.random() * arr.length)];
 }
@@ -163,6 +339,17 @@ function playVoice(type, opts = {}) {
   const file = pick(list);
   const key = `${type}/${file}`;
 
+  const sprite = sprites[type];
+  if (sprite && sprite.clips[file]) {
+    if (interrupt && currentAudio) {
+      currentAudio.pause();
+      currentAudio.currentTime = 0;
+    }
+    return new Promise(resolve => {
+      currentAudio = playSprite(sprite, sprite.clips[file], resolve);
+    });
+  }
+
   if (!audioCache[key]) {
     const a = new Audio(`/static/audio/${type}/${file}`);
     a.preload = "auto";
@@ -317,6 +504,12 @@ function resetUI() {
 }
 
 function restart() {
+  closeChannel();
+  if (offlineGame && (offlineGame.needs_upload || !session?.session_id) && offlineGame.attempts.length) {
+    queueOfflineGame(false);
+  }
+  RGStorage.clearCurrent();
+  offlineGame = null;
   session = null;
   items = [];
   idx = 0;
@@ -363,21 +556,60 @@ async function start() {
   // объявляем mode ОДИН раз
   const mode = window.rg_selected_mode || "word_flash";
 
-  // запрос ОДИН раз
-  const data = await api("/api/sessions/start", {
-    method: "POST",
-    body: JSON.stringify({
-      child_id: childId,
-      mode: mode,
-      difficulty: difficulty,
-      theme_id: themeId
-    })
-  });
+  // следующий раунд уже начат на финише прошлого — если ребёнок, режим, уровень
+  // и тема те же, запрос не нужен; иначе ОДИН запрос; без сети — последняя
+  // колода того же режима из storage.js
+  let data;
+  const ready = nextSession;
+  nextSession = null;
+  const roundKey = `${childId}|${mode}|${difficulty}|${themeId}`;
+  roundsInRow = roundKey === lastRoundKey ? roundsInRow + 1 : 1;
+  lastRoundKey = roundKey;
+  try {
+    if (ready && ready.childId === childId && ready.data.mode === mode &&
+        ready.data.difficulty === difficulty && ready.data.theme_id === themeId) {
+      data = ready.data;
+    } else {
+      data = await api("/api/sessions/start", {
+        method: "POST",
+        body: JSON.stringify({
+          child_id: childId,
+          mode: mode,
+          difficulty: difficulty,
+          theme_id: themeId
+        })
+      });
+    }
+    RGStorage.cacheDeck(mode, difficulty, themeId, data);
+  } catch (e) {
+    const deck = RGStorage.cachedDeck(mode, difficulty, themeId);
+    if (!deck) {
+      setPill("Нет связи");
+      if (btnPlay) btnPlay.disabled = false;
+      throw e;
+    }
+    data = { ...deck, session_id: null, lives_left: deck.lives_start };
+  }
 
 // присваивания ОДИН раз
 session = data;
 items = data.items;
 idx = 0;
+outstandingAttempts = [];
+if (data.session_id) openChannel(data.session_id);
+
+  offlineGame = {
+    client_id: RGStorage.uuid(),
+    session_id: data.session_id,
+    child_id: childId,
+    mode: data.mode || mode,
+    difficulty: data.difficulty || difficulty,
+    theme_id: data.theme_id || themeId,
+    exposure_ms: data.exposure_ms,
+    started_at: new Date().toISOString(),
+    attempts: [],
+  };
+  RGStorage.saveCurrent(offlineGame);
 
   gameMode = data.mode || mode;
 
@@ -402,7 +634,7 @@ idx = 0;
 
   renderLives();
   const sInfo = $("sessionInfo");
-  if (sInfo) sInfo.textContent = `Сессия: #${data.session_id}`;
+  if (sInfo) sInfo.textContent = data.session_id ? `Сессия: #${data.session_id}` : "Сессия: без сети";
   const spInfo = $("speedInfo");
   if (spInfo) spInfo.textContent = `Показ: ${data.exposure_ms} мс`;
 
@@ -636,16 +868,35 @@ async function answer(it, chosen, btnEl) {
     if (rightBtn) rightBtn.classList.add("ok");
   }
 
-  // Send attempt
-  const attemptResp = await api(`/api/sessions/${session.session_id}/attempt`, {
-  method: "POST",
-  body: JSON.stringify({
+  // Send attempt: survival waits for lives, other modes don't wait at all
+  const attempt = {
+    client_id: RGStorage.uuid(),
     item_id: it.item_id,
     correct: correct,
     reaction_ms: reaction,
     shown_ms: it.exposure_ms
-  })
-});
+  };
+  recordAttempt(attempt);
+  // без сети жизни считаем сами, как сервер
+  const localLives = () => {
+    if (!correct) livesLeft = Math.max(0, livesLeft - 1);
+    return { lives_left: livesLeft, finished: livesLeft <= 0 };
+  };
+  let attemptResp = {};
+  if (!session.session_id) {
+    if (gameMode === "survival") attemptResp = localLives();
+  } else if (gameMode === "survival") {
+    try {
+      attemptResp = await sendAttempt(session.session_id, attempt);
+    } catch (e) {
+      markNeedsUpload();
+      attemptResp = localLives();
+    }
+  } else {
+    const p = sendAttempt(session.session_id, attempt);
+    p.catch(e => { console.warn("attempt failed", e); markNeedsUpload(); });
+    outstandingAttempts.push(p);
+  }
   if (gameMode === "survival") {
   if (typeof attemptResp.lives_left === "number") livesLeft = attemptResp.lives_left;
 
@@ -757,9 +1008,29 @@ async function finish() {
   setToast("Считаю результат…");
   setPill("Готово");
 
-  const out = await api(`/api/sessions/${session.session_id}/finish`, { method: "POST" });
+  // всё, что не дошло, уйдёт одной выгрузкой — она же и финиширует игру
+  let out = null;
+  if (session.session_id && !(offlineGame && offlineGame.needs_upload)) {
+    try {
+      out = await sendFinish(session.session_id, roundsInRow > 1);
+      if (out.next_session) nextSession = { childId: offlineGame ? offlineGame.child_id : null, data: out.next_session };
+    } catch (e) {
+      console.warn("finish failed", e);
+    }
+  }
+  closeChannel();
 
-  setToast("Тренировка закончилась. Можно сыграть ещё раз.");
+  if (out) {
+    RGStorage.clearCurrent();
+    offlineGame = null;
+    RGStorage.sync();   // связь есть — отправим накопленное
+    setToast("Тренировка закончилась. Можно сыграть ещё раз.");
+  } else {
+    out = localResult();
+    queueOfflineGame(true);
+    RGStorage.sync();
+    setToast("Нет связи: результат сохранён и отправится позже.");
+  }
   renderResult(out);
   if (out.new_achievements && out.new_achievements.length) {
   showAchievements(out.new_achievements);
@@ -782,6 +1053,8 @@ if (btnPlay) btnPlay.disabled = false;
 // ===================== Init =====================
 (function init() {
   loadSoundPref();
+  RGStorage.sync();
+  loadAudioSprites().catch(() => {});
   loadThemes().catch(() => {});
   loadChildren().catch(() => {});
   resetUI();
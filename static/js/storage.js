@@ -0,0 +1,127 @@
+// ===================== OFFLINE STORAGE =====================
+// Games played without network are kept in localStorage and uploaded in batches
+// to POST /api/sessions/upload when the connection is back.
+// - Every attempt has a client UUID, so re-uploading is safe: the server skips
+//   attempts it already has and finishes each game once.
+// - The game in progress is saved after every answer (survives a page reload).
+// - The last deck per mode/difficulty/theme is cached, so a round can start offline.
+
+(function () {
+  const QUEUE_KEY = "rg_offline_queue";
+  const CURRENT_KEY = "rg_offline_current";
+  const DECK_KEY = "rg_offline_decks";
+  const UPLOAD_BATCH = 20;       // games per request (server limit: UPLOAD_MAX_SESSIONS)
+  const MAX_TRIES = 5;           // a game the server keeps rejecting is dropped after this
+
+  function read(key, fallback) {
+    try {
+      const v = localStorage.getItem(key);
+      return v === null ? fallback : JSON.parse(v);
+    } catch (e) {
+      return fallback;
+    }
+  }
+
+  function write(key, value) {
+    try {
+      localStorage.setItem(key, JSON.stringify(value));
+    } catch (e) {
+      // quota / private mode: offline support is best effort
+    }
+  }
+
+  function uuid() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    // RFC 4122 v4 from Math.random — old browsers only
+    return "xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx".replace(/[xy]/g, c => {
+      const r = Math.random() * 16 | 0;
+      return (c === "x" ? r : (r & 0x3 | 0x8)).toString(16);
+    });
+  }
+
+  // ---- game in progress ----
+
+  function saveCurrent(game) { write(CURRENT_KEY, game); }
+  function loadCurrent() { return read(CURRENT_KEY, null); }
+  function clearCurrent() { localStorage.removeItem(CURRENT_KEY); }
+
+  // ---- queue ----
+
+  function pending() { return read(QUEUE_KEY, []); }
+
+  function enqueue(game) {
+    const queue = pending().filter(g => g.client_id !== game.client_id);
+    queue.push(game);
+    write(QUEUE_KEY, queue);
+  }
+
+  let syncing = null;
+
+  // Upload queued games; resolves with the number still waiting.
+  function sync() {
+    if (syncing) return syncing;
+    syncing = (async () => {
+      try {
+        const sent = new Set();   // each game at most once per sync
+        for (;;) {
+          const batch = pending().filter(g => !sent.has(g.client_id)).slice(0, UPLOAD_BATCH);
+          if (!batch.length) break;
+          batch.forEach(g => sent.add(g.client_id));
+          const res = await fetch("/api/sessions/upload", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify(batch.map(({ tries, ...g }) => g)),
+          });
+          if (!res.ok) break;
+          const results = await res.json();
+
+          const done = new Set();
+          const failed = new Set();
+          for (const r of results) (r.status === "error" ? failed : done).add(r.client_id);
+
+          // re-read: a game may have been queued while the request was in flight
+          const queue = pending()
+            .filter(g => !done.has(g.client_id))
+            .map(g => failed.has(g.client_id) ? { ...g, tries: (g.tries || 0) + 1 } : g)
+            .filter(g => (g.tries || 0) < MAX_TRIES);
+          write(QUEUE_KEY, queue);
+          if (!done.size) break;   // nothing accepted: try again later
+        }
+      } catch (e) {
+        // still offline
+      } finally {
+        syncing = null;
+      }
+      return pending().length;
+    })();
+    return syncing;
+  }
+
+  // ---- decks for offline start ----
+
+  function deckKey(mode, difficulty, themeId) { return `${mode}|${difficulty}|${themeId}`; }
+
+  function cacheDeck(mode, difficulty, themeId, data) {
+    const decks = read(DECK_KEY, {});
+    decks[deckKey(mode, difficulty, themeId)] = data;
+    write(DECK_KEY, decks);
+  }
+
+  function cachedDeck(mode, difficulty, themeId) {
+    return read(DECK_KEY, {})[deckKey(mode, difficulty, themeId)] || null;
+  }
+
+  // a game left unfinished by a reload goes to the queue as is (no finish time)
+  const left = loadCurrent();
+  if (left) {
+    enqueue(left);
+    clearCurrent();
+  }
+  window.addEventListener("online", () => { sync(); });
+
+  window.RGStorage = {
+    uuid, saveCurrent, loadCurrent, clearCurrent,
+    pending, enqueue, sync,
+    cacheDeck, cachedDeck,
+  };
+})();